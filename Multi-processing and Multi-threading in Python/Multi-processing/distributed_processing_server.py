@@ -5,17 +5,52 @@
 Distributed processing: distribute multiple processes to multiple machines.
 
 Task server module.
+
+(Check out mpmt/task_queue.py for the reusable version, with the
+"mpmt-task-server" and "mpmt-task-worker" console scripts.)
 """
 
 __author__ = 'Ziang Lu'
 
+import queue
 import random
-from multiprocessing import Queue
 from multiprocessing.managers import BaseManager
 
-# 创建发送任务的queue和接受结果的queue
-task_queue = Queue(maxsize=5)
-result_queue = Queue(maxsize=5)
+# 发送任务的queue和接受结果的queue
+# They live in the manager's server process, and are only created there (by
+# init_queues()), so that importing this module creates nothing
+task_queue = None
+result_queue = None
+
+
+def init_queues(maxsize: int) -> None:
+    """
+    Creates the task queue and the result queue, within the manager's server
+    process.
+    :param maxsize: int
+    :return: None
+    """
+    global task_queue, result_queue
+    task_queue = queue.Queue(maxsize=maxsize)
+    result_queue = queue.Queue(maxsize=maxsize)
+
+
+def get_task_queue() -> queue.Queue:
+    """
+    Returns the task queue, within the manager's server process.
+    Module-level functions (rather than lambdas) are registered, so that the
+    manager can also be started under the "spawn" start method.
+    :return: Queue
+    """
+    return task_queue
+
+
+def get_result_queue() -> queue.Queue:
+    """
+    Returns the result queue, within the manager's server process.
+    :return: Queue
+    """
+    return result_queue
 
 
 class ServerQueueManager(BaseManager):
@@ -23,63 +58,67 @@ class ServerQueueManager(BaseManager):
 
 
 # 给ServerQueueManager注册两个函数来分别返回两个queue
-ServerQueueManager.register('get_task_queue', callable=lambda: task_queue)
-ServerQueueManager.register('get_result_queue', callable=lambda: result_queue)
-
-
-##### SERVER-SIDE #####
-
-# 创建manager, 并绑定端口5000, 设置authkey "abc"
-server_manager = ServerQueueManager(address=('', 5000), authkey=b'abc')
-# 启动manager
-server_manager.start()
-print('Server manager started.')
-
-# 通过ServerQueueManager封装来获取task_queue和result_queue
-task_q = server_manager.get_task_queue()  # 本质上是个proxy
-result_q = server_manager.get_result_queue()  # 本质上是个proxy
-
-# 向task_q设置任务
-for _ in range(10):
-    n = random.randint(0, 10000)
-    print(f'Put task {n}...')
-    task_q.put(n)
-
-# Output:
-# Server manager started.
-# Put task 8739...
-# Put task 5790...
-# Put task 474...
-# Put task 8122...
-# Put task 4101...
-# Put task 8863...
-# Put task 3944...
-# Put task 7217...
-# Put task 6542...
-# Put task 2097...
-
-
-# 从result_q读取任务结果
-print('Getting results...')
-for _ in range(10):
-    # Will block here and wait for getting results
-    r = result_q.get(timeout=10)
-    print(f'Result: {r}')
-
-# 关闭manager
-server_manager.shutdown()
-print('Server manager exited.')
-
-# Output:
-# Getting results...
-# Result: 8739 * 8739 = 76370121
-# Result: 5790 * 5790 = 33524100
-# Result: 474 * 474 = 224676
-# Result: 8122 * 8122 = 65966884
-# Result: 4101 * 4101 = 16818201
-# Result: 8863 * 8863 = 78552769
-# Result: 3944 * 3944 = 15555136
-# Result: 7217 * 7217 = 52085089
-# Result: 6542 * 6542 = 42797764
-# Result: 2097 * 2097 = 4397409
-# Server manager exited.
+ServerQueueManager.register('get_task_queue', callable=get_task_queue)
+ServerQueueManager.register('get_result_queue', callable=get_result_queue)
+
+
+def main() -> None:
+    ##### SERVER-SIDE #####
+
+    # 创建manager, 并绑定端口5000, 设置authkey "abc"
+    server_manager = ServerQueueManager(address=('', 5000), authkey=b'abc')
+    # 启动manager
+    server_manager.start(initializer=init_queues, initargs=(5,))
+    print('Server manager started.')
+
+    # 通过ServerQueueManager封装来获取task_queue和result_queue
+    task_q = server_manager.get_task_queue()  # 本质上是个proxy
+    result_q = server_manager.get_result_queue()  # 本质上是个proxy
+
+    # 向task_q设置任务
+    for _ in range(10):
+        n = random.randint(0, 10000)
+        print(f'Put task {n}...')
+        task_q.put(n)
+
+    # Output:
+    # Server manager started.
+    # Put task 8739...
+    # Put task 5790...
+    # Put task 474...
+    # Put task 8122...
+    # Put task 4101...
+    # Put task 8863...
+    # Put task 3944...
+    # Put task 7217...
+    # Put task 6542...
+    # Put task 2097...
+
+    # 从result_q读取任务结果
+    print('Getting results...')
+    for _ in range(10):
+        # Will block here and wait for getting results
+        r = result_q.get(timeout=10)
+        print(f'Result: {r}')
+
+    # 关闭manager
+    server_manager.shutdown()
+    print('Server manager exited.')
+
+    # Output:
+    # Getting results...
+    # Result: 8739 * 8739 = 76370121
+    # Result: 5790 * 5790 = 33524100
+    # Result: 474 * 474 = 224676
+    # Result: 8122 * 8122 = 65966884
+    # Result: 4101 * 4101 = 16818201
+    # Result: 8863 * 8863 = 78552769
+    # Result: 3944 * 3944 = 15555136
+    # Result: 7217 * 7217 = 52085089
+    # Result: 6542 * 6542 = 42797764
+    # Result: 2097 * 2097 = 4397409
+    # Server manager exited.
+
+
+if __name__ == '__main__':
+    main()
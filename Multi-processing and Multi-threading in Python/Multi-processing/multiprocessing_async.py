@@ -110,3 +110,10 @@ def demo2():
     # Theoretical total running time: 10.00 seconds.
     # Actual running time: 3.18 seconds.
     # All subprocesses done.
+
+
+if __name__ == '__main__':
+    # Without this guard, every worker process would re-run the demos when it
+    # imports this module under the "spawn" start method
+    demo1()
+    demo2()
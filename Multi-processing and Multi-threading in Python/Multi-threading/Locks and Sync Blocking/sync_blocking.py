@@ -10,7 +10,18 @@ threading.Semaphore/threading.BoundedSemaphore.
 __author__ = 'Ziang Lu'
 
 import time
-from threading import BoundedSemaphore, Lock, Semaphore, Thread, current_thread
+from threading import Thread, current_thread
+
+# Drop-in replacements for the threading primitives, which are the plain ones
+# unless run with LOCK_PROFILE=1 (check out mpmt/instrumented_locks.py)
+# Without the mpmt package ("pip install -e ." at the root of this repo), simply
+# use the plain ones.
+try:
+    from mpmt import instrumented_locks
+    from mpmt.instrumented_locks import BoundedSemaphore, Lock
+except ImportError:
+    instrumented_locks = None
+    from threading import BoundedSemaphore, Lock
 
 balance = 0
 
@@ -44,17 +55,17 @@ def change_balance(n: int) -> None:
     # 先存后取, 效果应该为无变化
 
 
-th1 = Thread(target=thread_func, args=(5,))
-th2 = Thread(target=thread_func, args=(8,))
-th1.start()
-th2.start()
-th1.join()
-th2.join()
-print(balance)
+def lock_demo() -> None:
+    th1 = Thread(target=thread_func, args=(5,))
+    th2 = Thread(target=thread_func, args=(8,))
+    th1.start()
+    th2.start()
+    th1.join()
+    th2.join()
+    print(balance)
 
-
-# Output:
-# 0
+    # Output:
+    # 0
 
 
 # Semaphore
@@ -87,19 +98,26 @@ def func() -> None:
         time.sleep(4)
 
 
-threads = [Thread(target=func) for _ in range(4)]
-for th in threads:
-    th.start()
-for th in threads:
-    th.join()
-
-
-# Output:
-# Thread-3 acquiring semaphore...
-# Thread-3 gets semaphore
-# Thread-4 acquiring semaphore...
-# Thread-4 gets semaphore
-# Thread-5 acquiring semaphore...
-# Thread-6 acquiring semaphore...   # Will block here for 4 seconds, waiting for the semaphore
-# Thread-5 gets semaphore
-# Thread-6 gets semaphore
+def semaphore_demo() -> None:
+    threads = [Thread(target=func) for _ in range(4)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    # Output:
+    # Thread-3 acquiring semaphore...
+    # Thread-3 gets semaphore
+    # Thread-4 acquiring semaphore...
+    # Thread-4 gets semaphore
+    # Thread-5 acquiring semaphore...
+    # Thread-6 acquiring semaphore...   # Will block here for 4 seconds, waiting for the semaphore
+    # Thread-5 gets semaphore
+    # Thread-6 gets semaphore
+
+
+if __name__ == '__main__':
+    lock_demo()
+    semaphore_demo()
+    if instrumented_locks is not None and instrumented_locks.is_enabled():
+        print(instrumented_locks.report())
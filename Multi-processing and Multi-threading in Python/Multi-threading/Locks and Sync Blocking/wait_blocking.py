@@ -9,10 +9,24 @@ threading.Condition and threading.Event.
 __author__ = 'Ziang Lu'
 
 import time
-from threading import Condition, Event, Thread, current_thread
+from threading import Event, Thread, current_thread
+
+# Drop-in replacement for threading.Condition, which is the plain one unless run
+# with LOCK_PROFILE=1 (check out mpmt/instrumented_locks.py)
+# Without the mpmt package ("pip install -e ." at the root of this repo), simply
+# use the plain one.
+try:
+    from mpmt.instrumented_locks import Condition
+except ImportError:
+    from threading import Condition
 
 # Condition
 
+# Note that trading a single "product" slot through a single Condition costs a
+# full handoff and two wakeups per item
+# Check out mpmt/bounded_buffer.py for a multi-slot buffer with separate
+# "not full" and "not empty" Conditions.
+
 product = None  # 商品
 condition = Condition()
 
@@ -45,15 +59,19 @@ def consumer() -> None:
             time.sleep(2)
 
 
-prod_thread = Thread(target=producer)
-cons_thread = Thread(target=consumer)
-prod_thread.start()
-cons_thread.start()
+def main() -> None:
+    prod_thread = Thread(target=producer)
+    cons_thread = Thread(target=consumer)
+    prod_thread.start()
+    cons_thread.start()
+
+    # Output:
+    # Producing something...
+    # Consuming something...
+    # Producing something...
+    # Consuming something...
+    # ...
 
 
-# Output:
-# Producing something...
-# Consuming something...
-# Producing something...
-# Consuming something...
-# ...
+if __name__ == '__main__':
+    main()
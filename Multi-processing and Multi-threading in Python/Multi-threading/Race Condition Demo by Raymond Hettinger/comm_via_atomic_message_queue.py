@@ -20,15 +20,45 @@ Specifically for solution with (atomic) message queue,
 1. Each shared resource shall be accessed in exactly its own thread.
 2. All communications with that thread shall be done using an atomic message
    queue.
+
+Note that the manager threads drain all the pending messages in one pass, so
+that the per-message lock and wakeup overhead doesn't dominate under a large
+number of messages.
+Check out mpmt/queue_managers.py for the reusable (fuzz-free) version of the
+two manager threads.
 """
 
 import random
+import sys
 import time
-from queue import Queue
 from threading import Thread
 
+# BatchQueue drains the pending messages under a single lock acquisition
+# (check out mpmt/batch_queue.py)
+# Without the mpmt package ("pip install -e ." at the root of this repo), drain
+# them message by message instead.
+try:
+    from mpmt.batch_queue import BatchQueue
+except ImportError:
+    from queue import Empty, Queue
+
+    class BatchQueue(Queue):
+        def get_many(self) -> list:
+            items = [self.get()]
+            try:
+                while True:
+                    items.append(self.get_nowait())
+            except Empty:
+                return items
+
+        def task_done_many(self, n: int) -> None:
+            for _ in range(n):
+                self.task_done()
+
 ##### Fuzzing technique #####
 
+# explore_schedules.py replaces fuzz() with a cooperative yield point, and
+# deterministically explores the thread interleavings
 FUZZ = False
 
 
@@ -50,7 +80,7 @@ def fuzz() -> None:
 
 # All communications with the print()-access daemon thread shall be done using
 # an atomic message queue. (=> 2)
-print_queue = Queue()  # Atomic message queue used for the print()-access daemon thread
+print_queue = BatchQueue()  # Atomic message queue used for the print()-access daemon thread
 
 
 def print_manager() -> None:
@@ -61,21 +91,19 @@ def print_manager() -> None:
     """
     while True:
         fuzz()
-        stuff_to_print = print_queue.get()
-        for line in stuff_to_print:
+        # Drain all the pending messages in one pass
+        batch = print_queue.get_many()
+        lines = []
+        for stuff_to_print in batch:
             fuzz()
-            print(line)
+            lines.extend(stuff_to_print)
         fuzz()
-        # Mark the task as done
-        print_queue.task_done()
-
-
-# Create and start the print()-access daemon thread
-print_daemon_thread = Thread(
-    target=print_manager, name='print()-access Daemon Thread'
-)
-print_daemon_thread.daemon = True
-print_daemon_thread.start()
+        # Emit the whole batch as one buffered write
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+        fuzz()
+        # Mark all the tasks in the batch as done
+        print_queue.task_done_many(len(batch))
 
 
 ##### Daemon thread for "counter" & Atomic message queue for "counter" #####
@@ -87,7 +115,7 @@ counter = 0
 # All communications with the "counter"-access daemon thread shall be done using
 # an atomic message queue. (=> 2)
 # Atomic message queue used for the "counter"-access daemon thread
-counter_queue = Queue()
+counter_queue = BatchQueue()
 
 
 def counter_manager() -> None:
@@ -102,24 +130,19 @@ def counter_manager() -> None:
         fuzz()
         old_val = counter
         fuzz()
-        increment = counter_queue.get()
+        # Drain all the pending increments in one pass
+        increments = counter_queue.get_many()
         fuzz()
-        counter = old_val + increment
+        # Apply them as a single aggregate update
+        counter = old_val + sum(increments)
         fuzz()
         # Send a message to the print()-access atomic message queue in order to
         # print the "counter" value
         print_queue.put([f'Counter value: {counter}', '----------'])
         fuzz()
-        # Mark the task as done
-        counter_queue.task_done()
-
-
-# Create and start the "counter"-access daemon thread
-counter_daemon_thread = Thread(
-    target=counter_manager, name='Counter-access Daemon Thread'
-)
-counter_daemon_thread.daemon = True
-counter_daemon_thread.start()
+        # Mark all the tasks in the batch as done, so that counter_queue.join()
+        # still waits until every increment has been applied
+        counter_queue.task_done_many(len(increments))
 
 
 ##### Actual workers #####
@@ -136,52 +159,73 @@ def worker() -> None:
     counter_queue.put(1)
 
 
-print_queue.put(['Starting up'])
-
-# Create and start 10 worker threads
-worker_threads = []
-for _ in range(10):
-    worker_thread = Thread(target=worker)
-    worker_threads.append(worker_thread)
-    worker_thread.start()
-    fuzz()
-# Join the 10 worker threads
-for worker_thread in worker_threads:
-    worker_thread.join()
-    fuzz()
-# By now, it is guaranteed that 10 messages have been sent to the
-# "counter"-access atomic message queue, but the tasks haven't necesserily been
-# done yet.
-
-# Note that since the "counter"-access queue is a daemon thread and never ends,
-# we cannot join it
-# Instead, we can join the atomic message queue itself, which waits until all
-# the tasks have been marked as done.
-counter_queue.join()
-
-print_queue.put(['Finishing up'])
-print_queue.join()  # Same reason as above
-
-# Output:
-# Starting up
-# Counter value: 1
-# ----------
-# Counter value: 2
-# ----------
-# Counter value: 3
-# ----------
-# Counter value: 4
-# ----------
-# Counter value: 5
-# ----------
-# Counter value: 6
-# ----------
-# Counter value: 7
-# ----------
-# Counter value: 8
-# ----------
-# Counter value: 9
-# ----------
-# Counter value: 10
-# ----------
-# Finishing up
+def main(n_workers: int = 10) -> None:
+    # Create and start the print()-access daemon thread
+    print_daemon_thread = Thread(
+        target=print_manager, name='print()-access Daemon Thread'
+    )
+    print_daemon_thread.daemon = True
+    print_daemon_thread.start()
+
+    # Create and start the "counter"-access daemon thread
+    counter_daemon_thread = Thread(
+        target=counter_manager, name='Counter-access Daemon Thread'
+    )
+    counter_daemon_thread.daemon = True
+    counter_daemon_thread.start()
+
+    print_queue.put(['Starting up'])
+
+    # Create and start the worker threads
+    worker_threads = []
+    for _ in range(n_workers):
+        worker_thread = Thread(target=worker)
+        worker_threads.append(worker_thread)
+        worker_thread.start()
+        fuzz()
+    # Join the worker threads
+    for worker_thread in worker_threads:
+        worker_thread.join()
+        fuzz()
+    # By now, it is guaranteed that n_workers messages have been sent to the
+    # "counter"-access atomic message queue, but the tasks haven't necesserily
+    # been done yet.
+
+    # Note that since the "counter"-access queue is a daemon thread and never
+    # ends, we cannot join it
+    # Instead, we can join the atomic message queue itself, which waits until
+    # all the tasks have been marked as done.
+    counter_queue.join()
+
+    print_queue.put(['Finishing up'])
+    print_queue.join()  # Same reason as above
+
+    # Output:
+    # (Since the increments are applied in batches, some of the intermediate
+    # values may be skipped, but the final value is always 10.)
+    # Starting up
+    # Counter value: 1
+    # ----------
+    # Counter value: 2
+    # ----------
+    # Counter value: 3
+    # ----------
+    # Counter value: 4
+    # ----------
+    # Counter value: 5
+    # ----------
+    # Counter value: 6
+    # ----------
+    # Counter value: 7
+    # ----------
+    # Counter value: 8
+    # ----------
+    # Counter value: 9
+    # ----------
+    # Counter value: 10
+    # ----------
+    # Finishing up
+
+
+if __name__ == '__main__':
+    main()
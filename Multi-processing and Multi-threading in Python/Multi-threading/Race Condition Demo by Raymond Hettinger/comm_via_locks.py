@@ -20,10 +20,23 @@ Specifically for solution with locks,
 
 import random
 import time
-from threading import Condition, Thread
+from threading import Thread
+
+# Drop-in replacement for threading.Condition, which is the plain one unless run
+# with LOCK_PROFILE=1 (check out mpmt/instrumented_locks.py)
+# Without the mpmt package ("pip install -e ." at the root of this repo), simply
+# use the plain one.
+try:
+    from mpmt import instrumented_locks
+    from mpmt.instrumented_locks import Condition
+except ImportError:
+    instrumented_locks = None
+    from threading import Condition
 
 ##### Fuzzing technique #####
 
+# explore_schedules.py replaces fuzz() with a cooperative yield point, and
+# deterministically explores the thread interleavings
 FUZZ = False
 
 
@@ -32,7 +45,7 @@ def fuzz() -> None:
     Fuzzes the program for a random amount of time, if instructed.
     :return: None
     """
-    if fuzz:
+    if FUZZ:
         time.sleep(random.random())
 
 
@@ -66,46 +79,53 @@ def worker() -> None:
             print('----------')
 
 
-# Lock on the print()-access lock
-with print_lock:
-    print('Starting up')
-
-# Create and start 10 worker threads
-worker_threads = []
-for _ in range(10):
-    worker_thread = Thread(target=worker)
-    worker_threads.append(worker_thread)
-    worker_thread.start()
-    fuzz()
-# Join the 10 worker threads
-for worker_thread in worker_threads:
-    worker_thread.join()
-    fuzz()
-
-# Lock on the print()-access lock
-with print_lock:
-    print('Finishing up')
-
-# Output:
-# Starting up
-# The counter value is 1
-# ----------
-# The counter value is 2
-# ----------
-# The counter value is 3
-# ----------
-# The counter value is 4
-# ----------
-# The counter value is 5
-# ----------
-# The counter value is 6
-# ----------
-# The counter value is 7
-# ----------
-# The counter value is 8
-# ----------
-# The counter value is 9
-# ----------
-# The counter value is 10
-# ----------
-# Finishing up
+def main(n_workers: int = 10) -> None:
+    # Lock on the print()-access lock
+    with print_lock:
+        print('Starting up')
+
+    # Create and start the worker threads
+    worker_threads = []
+    for _ in range(n_workers):
+        worker_thread = Thread(target=worker)
+        worker_threads.append(worker_thread)
+        worker_thread.start()
+        fuzz()
+    # Join the worker threads
+    for worker_thread in worker_threads:
+        worker_thread.join()
+        fuzz()
+
+    # Lock on the print()-access lock
+    with print_lock:
+        print('Finishing up')
+
+    # Output:
+    # Starting up
+    # The counter value is 1
+    # ----------
+    # The counter value is 2
+    # ----------
+    # The counter value is 3
+    # ----------
+    # The counter value is 4
+    # ----------
+    # The counter value is 5
+    # ----------
+    # The counter value is 6
+    # ----------
+    # The counter value is 7
+    # ----------
+    # The counter value is 8
+    # ----------
+    # The counter value is 9
+    # ----------
+    # The counter value is 10
+    # ----------
+    # Finishing up
+
+
+if __name__ == '__main__':
+    main()
+    if instrumented_locks is not None and instrumented_locks.is_enabled():
+        print(instrumented_locks.report())
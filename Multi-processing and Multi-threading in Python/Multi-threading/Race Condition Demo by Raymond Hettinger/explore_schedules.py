@@ -0,0 +1,201 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Deterministic schedule exploration of the race condition demos.
+
+Instead of sleeping a random amount of time at every fuzz() call site, fuzz()
+becomes a cooperative yield point of mpmt.schedule_explorer, and the demos'
+threads, locks and queues are swapped for the scheduler-aware ones.
+The unmodified demo code then runs one thread at a time, in the interleaving
+the explorer picks, at full speed: thousands of interleavings per second per
+process, instead of seconds per run.
+
+Unlike the demos themselves, this requires the mpmt package: run
+"pip install -e ." at the root of this repo first.
+
+Usage:
+    python explore_schedules.py [demo ...] [--strategy random|systematic]
+        [--seed 0] [--max-schedules 20000] [--workers 2] [--processes 4]
+    python explore_schedules.py race_condition --seed 1234 --max-schedules 1
+    python explore_schedules.py race_condition --replay 1,0,2,0
+"""
+
+__author__ = 'Ziang Lu'
+
+import argparse
+import os
+import sys
+from typing import Callable, Dict, Optional, Tuple
+from unittest import mock
+
+import comm_via_atomic_message_queue
+import comm_via_locks
+import race_condition
+from mpmt import schedule_explorer
+from mpmt.schedule_explorer import Condition, Queue, Thread, yield_point
+
+# Demo name -> (module, names to patch, main, check)
+Scenario = Tuple[object, Dict[str, object], Callable, Callable]
+
+
+def race_condition_scenario(n_workers: int) -> Scenario:
+    """
+    Every worker increments the counter without any synchronization.
+    :param n_workers: int
+    :return: Scenario
+    """
+    def main() -> None:
+        race_condition.counter = 0
+        race_condition.main(n_workers)
+
+    def check(output: str) -> Optional[str]:
+        if race_condition.counter != n_workers:
+            return (f'Lost update: counter is {race_condition.counter} after '
+                    f'{n_workers} increments')
+        return None
+
+    patches = {'fuzz': yield_point, 'Thread': Thread, 'counter': 0}
+    return race_condition, patches, main, check
+
+
+def comm_via_locks_scenario(n_workers: int) -> Scenario:
+    """
+    Every worker increments and prints the counter under the locks.
+    :param n_workers: int
+    :return: Scenario
+    """
+    expected = ['Starting up']
+    for i in range(1, n_workers + 1):
+        expected.extend([f'The counter value is {i}', '----------'])
+    expected.append('Finishing up')
+
+    def main() -> None:
+        comm_via_locks.counter = 0
+        comm_via_locks.print_lock = Condition()
+        comm_via_locks.counter_lock = Condition()
+        comm_via_locks.main(n_workers)
+
+    def check(output: str) -> Optional[str]:
+        if output.splitlines() != expected:
+            return f'Unexpected output:\n{output}'
+        return None
+
+    patches = {
+        'fuzz': yield_point, 'Thread': Thread, 'counter': 0,
+        'print_lock': None, 'counter_lock': None
+    }
+    return comm_via_locks, patches, main, check
+
+
+def comm_via_atomic_message_queue_scenario(n_workers: int) -> Scenario:
+    """
+    Every worker sends an increment to the counter manager thread, which sends
+    the new values to the print manager thread.
+    :param n_workers: int
+    :return: Scenario
+    """
+    module = comm_via_atomic_message_queue
+
+    def main() -> None:
+        module.counter = 0
+        module.print_queue = Queue()
+        module.counter_queue = Queue()
+        module.main(n_workers)
+
+    def check(output: str) -> Optional[str]:
+        lines = output.splitlines()
+        values = [int(line.split(': ')[1]) for line in lines
+                  if line.startswith('Counter value: ')]
+        if (module.counter != n_workers or lines[0] != 'Starting up' or
+                lines[-3:] != [f'Counter value: {n_workers}', '----------',
+                               'Finishing up'] or
+                values != sorted(set(values))):
+            return f'Unexpected output:\n{output}'
+        return None
+
+    patches = {
+        'fuzz': yield_point, 'Thread': Thread, 'counter': 0,
+        'print_queue': None, 'counter_queue': None
+    }
+    return module, patches, main, check
+
+
+SCENARIOS = {
+    'race_condition': race_condition_scenario,
+    'comm_via_locks': comm_via_locks_scenario,
+    'comm_via_atomic_message_queue': comm_via_atomic_message_queue_scenario,
+}
+
+
+def _print_failure(failure: schedule_explorer.Failure) -> None:
+    """
+    Private helper function to print the given failing schedule, and how to
+    replay it.
+    :param failure: Failure
+    :return: None
+    """
+    print(f'  FAILED schedule #{failure.schedule}: {failure.message}')
+    if failure.seed is not None:
+        print(f'  Replay with: --seed {failure.seed} --max-schedules 1')
+    print(f"  Replay with: --replay {','.join(map(str, failure.choices))}")
+    print(f"  Interleaving: {' -> '.join(failure.trace)}")
+    print('  Output:')
+    for line in failure.output.splitlines():
+        print(f'    {line}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Explore the thread interleavings of the race condition '
+                    'demos'
+    )
+    parser.add_argument(
+        'demos', nargs='*', help=f"any of {', '.join(SCENARIOS)} (default: all)"
+    )
+    parser.add_argument(
+        '--strategy', default=schedule_explorer.RANDOM,
+        choices=[schedule_explorer.RANDOM, schedule_explorer.SYSTEMATIC]
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-schedules', type=int, default=20000)
+    parser.add_argument('--time-budget', type=float, help='seconds per demo')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument(
+        '--processes', type=int, default=1,
+        help=f'processes for the random strategy (this machine has '
+             f'{os.cpu_count()} CPUs)'
+    )
+    parser.add_argument(
+        '--replay', help='comma-separated choices of a failing schedule'
+    )
+    args = parser.parse_args()
+    unknown = set(args.demos) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown demos: {', '.join(sorted(unknown))}")
+
+    all_passed = True
+    for name in args.demos or list(SCENARIOS):
+        module, patches, demo_main, check = SCENARIOS[name](args.workers)
+        with mock.patch.multiple(module, **patches):
+            if args.replay is not None:
+                choices = [int(choice) for choice in args.replay.split(',')]
+                result = schedule_explorer.replay(demo_main, choices, check)
+            else:
+                result = schedule_explorer.explore(
+                    demo_main, check, args.strategy, args.seed,
+                    args.max_schedules, args.time_budget,
+                    processes=args.processes
+                )
+        print(f'{name}: {result.n_schedules} schedules in '
+              f'{result.elapsed:.2f} s '
+              f'({result.schedules_per_sec:,.0f} schedules/s)'
+              f"{', exhausted' if result.exhausted else ''}")
+        for failure in result.failures:
+            _print_failure(failure)
+        all_passed = all_passed and not result.failures
+    sys.exit(0 if all_passed else 1)
+
+
+if __name__ == '__main__':
+    main()
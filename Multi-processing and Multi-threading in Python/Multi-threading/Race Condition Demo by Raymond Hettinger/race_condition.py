@@ -13,6 +13,9 @@ from threading import Thread
 # visible.
 # Basically, define a fuzz() function, which simply sleeps a random amount of
 # time if instructed, and then call the fuzz() function before each operation
+# Sleeping only finds races by chance, though
+# => explore_schedules.py turns the same fuzz() call sites into cooperative
+#    yield points, and deterministically explores the thread interleavings
 
 # Fuzzing setup
 
@@ -53,8 +56,13 @@ def worker() -> None:
     print('----------')
 
 
-print('Starting up')
-for _ in range(10):
-    Thread(target=worker).start()
-    fuzz()
-print('Finishing up')
+def main(n_workers: int = 10) -> None:
+    print('Starting up')
+    for _ in range(n_workers):
+        Thread(target=worker).start()
+        fuzz()
+    print('Finishing up')
+
+
+if __name__ == '__main__':
+    main()
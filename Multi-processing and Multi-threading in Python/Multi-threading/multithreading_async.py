@@ -10,6 +10,7 @@ __author__ = 'Ziang Lu'
 import concurrent.futures as cf
 
 import requests
+from requests.adapters import HTTPAdapter
 
 sites = [
     'http://europe.wsj.com/',
@@ -20,38 +21,71 @@ sites = [
 ]
 
 
-def site_size(url: str) -> int:
+MAX_WORKERS = 10
+# Without timeouts, an unreachable host ties up a thread for as long as the OS
+# keeps trying to connect
+# Check out mpmt/host_limits.py for per-host limits and fast-fail for dead
+# hosts.
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+
+def site_size(url: str, session) -> int:
     """
     Returns the page size in bytes of the given URL.
     :param url: str
-    :return: str
+    :param session: Session
+    :return: int
     """
-    response = requests.get(url)
+    response = session.get(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
     return len(response.content)
 
 
-# Create a thread pool with 10 threads
-with cf.ThreadPoolExecutor(max_workers=10) as pool:
-    # Submit tasks for execution
-    future_to_url = {pool.submit(site_size, url): url for url in sites}  # Will NOT block here
-
-    # Since submit() method is asynchronous (non-blocking), by now the tasks in
-    # the thread pool are still executing, but in this main thread, we have
-    # successfully proceeded to here.
-    # Wait until all the submitted tasks have been completed
-    for future in cf.as_completed(future_to_url):
-        url = future_to_url[future]
-        try:
-            # Get the execution result
-            page_size = future.result()
-        except Exception as e:
-            print(f'{url} generated an exception: {e}')
-        else:
-            print(f'{url} page is {page_size} bytes.')
-
-# Output:
-# http://some-made-up-domain.com/ generated an exception: HTTPConnectionPool(host='some-made-up-domain.com', port=80): Max retries exceeded with url: / (Caused by NewConnectionError('<urllib3.connection.HTTPConnection object at 0x109546c90>: Failed to establish a new connection: [Errno 8] nodename nor servname provided, or not known'))
-# http://www.foxnews.com/ page is 216594 bytes.
-# http://www.cnn.com/ page is 1725827 bytes.
-# http://europe.wsj.com/ page is 979035 bytes.
-# http://www.bbc.co.uk/ page is 289252 bytes.
+def main() -> None:
+    # A bare requests.get() opens a new connection (new TCP and TLS handshakes)
+    # for every URL.
+    # Instead, share one session across all the threads in the thread pool, so
+    # that the connections to each host are kept alive and reused.
+    # (urllib3's connection pools are thread-safe.)
+    # Make each per-host pool as large as the thread pool, so that no thread
+    # has to discard its connection after use.
+    # Check out mpmt/fetching.py for more details, and
+    # "python -m mpmt.benchmarks.fetching" for a benchmark.
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=len(sites), pool_maxsize=MAX_WORKERS
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    # Create a thread pool with 10 threads
+    with session, cf.ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        # Submit tasks for execution
+        future_to_url = {
+            pool.submit(site_size, url, session): url for url in sites
+        }  # Will NOT block here
+
+        # Since submit() method is asynchronous (non-blocking), by now the tasks
+        # in the thread pool are still executing, but in this main thread, we
+        # have successfully proceeded to here.
+        # Wait until all the submitted tasks have been completed
+        for future in cf.as_completed(future_to_url):
+            url = future_to_url[future]
+            try:
+                # Get the execution result
+                page_size = future.result()
+            except Exception as e:
+                print(f'{url} generated an exception: {e}')
+            else:
+                print(f'{url} page is {page_size} bytes.')
+
+    # Output:
+    # http://some-made-up-domain.com/ generated an exception: HTTPConnectionPool(host='some-made-up-domain.com', port=80): Max retries exceeded with url: / (Caused by NewConnectionError('<urllib3.connection.HTTPConnection object at 0x109546c90>: Failed to establish a new connection: [Errno 8] nodename nor servname provided, or not known'))
+    # http://www.foxnews.com/ page is 216594 bytes.
+    # http://www.cnn.com/ page is 1725827 bytes.
+    # http://europe.wsj.com/ page is 979035 bytes.
+    # http://www.bbc.co.uk/ page is 289252 bytes.
+
+
+if __name__ == '__main__':
+    main()
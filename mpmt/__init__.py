@@ -0,0 +1,83 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Importable multi-processing and multi-threading primitives, from the examples
+in this repo.
+
+Importing the package imports none of its submodules: every name below is
+loaded from its submodule on first access (PEP 562), so that e.g.
+"from mpmt import StripedCounter" pays neither for requests/aiohttp nor for
+redis, and nothing starts a thread, a process or a server at import time.
+The demos only run behind "python -m mpmt.<module>" or the console scripts, and
+the benchmarks live in mpmt.benchmarks, behind
+"python -m mpmt.benchmarks.<name>".
+"""
+
+__author__ = 'Ziang Lu'
+
+import importlib
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    # Queues and buffers
+    'BatchQueue': 'batch_queue',
+    'BoundedBuffer': 'bounded_buffer',
+    'BufferClosed': 'bounded_buffer',
+    'ShmRingBuffer': 'shm_ring_buffer',
+    'PrintManager': 'queue_managers',
+    'CounterManager': 'queue_managers',
+    # Locks and counters
+    'StripedCounter': 'striped_counter',
+    'WeightedSemaphore': 'weighted_semaphore',
+    'AsyncWeightedSemaphore': 'weighted_semaphore',
+    'instrumented_locks': None,
+    'distributed_locking': None,
+    # Deterministic schedule exploration of threaded code
+    'schedule_explorer': None,
+    # Pools and the distributed task server/worker
+    'PoolRun': 'pools',
+    'run_in_pool': 'pools',
+    'ServerQueueManager': 'task_queue',
+    'WorkerQueueManager': 'task_queue',
+    'start_server': 'task_queue',
+    'connect_worker': 'task_queue',
+    'run_worker': 'task_queue',
+    # HTTP fetching (requires the "http" extra)
+    'make_session': 'fetching',
+    'get_session': 'fetching',
+    'site_size': 'fetching',
+    'streamed_site_size': 'fetching',
+    'site_sizes': 'fetching',
+    'async_site_sizes': 'fetching',
+    'SiteSizeCache': 'site_size_cache',
+    'HostLimiter': 'host_limits',
+    'CircuitOpenError': 'host_limits',
+    'StandInServer': 'local_http_server',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """
+    Imports the submodule defining the given name on first access, and caches
+    the name in the package namespace.
+    :param name: str
+    :return: object
+    """
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    submodule = _EXPORTS[name]
+    if submodule is None:  # The exported name is a submodule itself
+        value = importlib.import_module(f'{__name__}.{name}')
+    else:
+        value = getattr(
+            importlib.import_module(f'{__name__}.{submodule}'), name
+        )
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
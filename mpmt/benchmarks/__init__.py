@@ -0,0 +1,4 @@
+"""
+Benchmarks of the primitives in mpmt, each runnable with
+"python -m mpmt.benchmarks.<name>".
+"""
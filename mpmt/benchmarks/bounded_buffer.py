@@ -0,0 +1,124 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the single-slot Condition ping-pong of wait_blocking.py vs.
+BoundedBuffer, in items/sec, with single and batched puts and gets.
+
+Usage:
+    python -m mpmt.benchmarks.bounded_buffer
+"""
+
+__author__ = 'Ziang Lu'
+
+import time
+from threading import Condition, Thread
+
+from mpmt.bounded_buffer import BoundedBuffer, BufferClosed
+
+N_ITEMS = 200000
+
+
+def ping_pong() -> float:
+    """
+    wait_blocking.py pattern (without the 2-second sleeps): a single "product"
+    slot traded through a single Condition.
+    :return: float items/sec
+    """
+    condition = Condition()
+    product = None
+
+    def producer() -> None:
+        nonlocal product
+        for i in range(N_ITEMS):
+            with condition:
+                condition.wait_for(lambda: product is None)
+                product = i
+                condition.notify()
+
+    def consumer() -> None:
+        nonlocal product
+        for _ in range(N_ITEMS):
+            with condition:
+                condition.wait_for(lambda: product is not None)
+                product = None
+                condition.notify()
+
+    return _run([producer], [consumer])
+
+
+def bounded_buffer(n_producers: int, n_consumers: int, capacity: int = 1024,
+                   batch_size: int = 1) -> float:
+    """
+    BoundedBuffer with the given numbers of producers and consumers, each moving
+    items in batches of the given size.
+    :param n_producers: int
+    :param n_consumers: int
+    :param capacity: int
+    :param batch_size: int
+    :return: float items/sec
+    """
+    buffer = BoundedBuffer(capacity)
+    n_per_producer = N_ITEMS // n_producers
+
+    def producer() -> None:
+        if batch_size == 1:
+            for i in range(n_per_producer):
+                buffer.put(i)
+        else:
+            for start in range(0, n_per_producer, batch_size):
+                buffer.put_many(
+                    range(start, min(start + batch_size, n_per_producer))
+                )
+
+    def consumer() -> None:
+        try:
+            while True:
+                if batch_size == 1:
+                    buffer.get()
+                else:
+                    buffer.get_many(batch_size)
+        except BufferClosed:
+            pass
+
+    producers = [Thread(target=producer) for _ in range(n_producers)]
+    consumers = [Thread(target=consumer) for _ in range(n_consumers)]
+    start = time.perf_counter()
+    for th in producers + consumers:
+        th.start()
+    for th in producers:
+        th.join()
+    buffer.close()
+    for th in consumers:
+        th.join()
+    return n_per_producer * n_producers / (time.perf_counter() - start)
+
+
+def _run(producers: list, consumers: list) -> float:
+    """
+    Private helper function to run the given producer and consumer functions
+    on their own threads, and return the items moved per second.
+    :param producers: list[callable]
+    :param consumers: list[callable]
+    :return: float
+    """
+    threads = [Thread(target=func) for func in producers + consumers]
+    start = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return N_ITEMS / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    print(f'{"Condition ping-pong, 1P/1C":<36} {ping_pong():>12,.0f} items/s')
+    for n_producers, n_consumers, batch_size in [
+        (1, 1, 1), (4, 4, 1), (1, 1, 64), (4, 4, 64)
+    ]:
+        name = (f'BoundedBuffer, {n_producers}P/{n_consumers}C, '
+                f'batch {batch_size}')
+        items_per_sec = bounded_buffer(
+            n_producers, n_consumers, batch_size=batch_size
+        )
+        print(f'{name:<36} {items_per_sec:>12,.0f} items/s')
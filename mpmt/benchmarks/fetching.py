@@ -0,0 +1,98 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the connection-per-request requests.get() vs. the pooled,
+kept-alive Session and aiohttp, against a local stand-in server: throughput,
+and the number of TCP connections opened.
+
+Usage:
+    python -m mpmt.benchmarks.fetching
+"""
+
+__author__ = 'Ziang Lu'
+
+import asyncio
+import concurrent.futures as cf
+import time
+from typing import List
+
+import requests
+
+from mpmt.fetching import async_site_sizes, site_sizes
+from mpmt.local_http_server import StandInServer
+
+
+def _bare_site_size(url: str) -> int:
+    """
+    The original, connection-per-request version of site_size().
+    :param url: str
+    :return: int
+    """
+    response = requests.get(url)
+    return len(response.content)
+
+
+def _benchmark(name: str, fetch, n_requests: int, latency: float) -> None:
+    """
+    Private helper function to run the given fetch function against a fresh
+    stand-in server, and report its throughput and the number of TCP connections
+    it opened.
+    :param name: str
+    :param fetch: callable
+    :param n_requests: int
+    :param latency: float
+    :return: None
+    """
+    with StandInServer(latency=latency) as server:
+        urls = [f'{server.base_url}/{i}' for i in range(n_requests)]
+        start = time.perf_counter()
+        results = fetch(urls)
+        elapsed = time.perf_counter() - start
+        n_errors = sum(isinstance(result, Exception) for result in results)
+        print(f'{name:<32} {n_requests:>5} requests  {elapsed:6.2f} s  '
+              f'{n_requests / elapsed:8.1f} req/s  '
+              f'{server.connection_count:>5} connections  {n_errors} errors')
+
+
+def _bare_site_sizes(urls: List[str]) -> list:
+    """
+    Private helper function to fetch the page sizes of the given URLs with
+    _bare_site_size() in a thread pool.
+    :param urls: list[str]
+    :return: list
+    """
+    with cf.ThreadPoolExecutor(max_workers=10) as pool:
+        futures = [pool.submit(_bare_site_size, url) for url in urls]
+        return [_result_or_exception(future) for future in futures]
+
+
+def _result_or_exception(future: cf.Future):
+    """
+    Private helper function to get the result of the given future, or the
+    exception it raised.
+    :param future: Future
+    :return: object
+    """
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+
+if __name__ == '__main__':
+    LATENCY = 0.02
+    _benchmark('requests.get, 10 threads', _bare_site_sizes, 500, LATENCY)
+    _benchmark('pooled Session, 10 threads', site_sizes, 500, LATENCY)
+    _benchmark(
+        'pooled Session, 50 threads',
+        lambda urls: site_sizes(urls, max_workers=50), 500, LATENCY
+    )
+    _benchmark(
+        'aiohttp, 1 thread',
+        lambda urls: asyncio.run(async_site_sizes(urls)), 500, LATENCY
+    )
+    _benchmark(
+        'aiohttp, 1 thread',
+        lambda urls: asyncio.run(async_site_sizes(urls)), 3000, LATENCY
+    )
@@ -0,0 +1,365 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Scaling benchmarks of the threading examples, with and without the GIL.
+
+Every pattern below mirrors one of the threaded examples in this repo, and is
+run on the same harness at 1 to N threads, with a fixed amount of work per
+thread, so that perfect scaling means a throughput proportional to the number
+of threads.
+- With the GIL, the CPU-bound patterns cannot scale at all.
+- On a free-threaded (no-GIL) build, e.g., CPython 3.13t, they run truly in
+  parallel, and then the patterns which serialize on a lock, or whose threads
+  write to memory shared with each other (false sharing), collapse.
+
+The harness runs every interpreter configuration in its own subprocess:
+- On a free-threaded build, both "-X gil=0" and "-X gil=1"
+- Otherwise, the GIL build only
+and flags the patterns whose throughput collapses or scales poorly.
+
+Usage:
+    python -m mpmt.benchmarks.free_threaded [--max-threads 8]
+        [--python python3.13t --python python3.13]
+"""
+
+__author__ = 'Ziang Lu'
+
+import argparse
+import concurrent.futures as cf
+import json
+import os
+import subprocess
+import sys
+import sysconfig
+import time
+from queue import Queue
+from threading import Barrier, Condition, Lock, Thread
+from typing import Callable, Dict, List
+
+OPS_PER_THREAD = 300000
+
+# A pattern takes the number of threads, and returns the target function of
+# each thread (which takes the thread index)
+Pattern = Callable[[int], Callable[[int], None]]
+
+
+##### Patterns #####
+
+
+def independent_work(n_threads: int) -> Callable[[int], None]:
+    """
+    Reference: every thread works on its own local variable, with nothing
+    shared.
+    :param n_threads: int
+    :return: callable
+    """
+    def target(i: int) -> None:
+        total = 0
+        for _ in range(OPS_PER_THREAD):
+            total += 1
+
+    return target
+
+
+def locked_balance(n_threads: int) -> Callable[[int], None]:
+    """
+    sync_blocking.thread_func(): every thread changes a global balance under a
+    single Lock.
+    :param n_threads: int
+    :return: callable
+    """
+    lock = Lock()
+    state = {'balance': 0}
+
+    def target(i: int) -> None:
+        for _ in range(OPS_PER_THREAD):
+            with lock:
+                state['balance'] += 5
+                state['balance'] -= 5
+
+    return target
+
+
+def condition_counter(n_threads: int) -> Callable[[int], None]:
+    """
+    comm_via_locks.worker(): every thread increments a global counter under a
+    single Condition.
+    :param n_threads: int
+    :return: callable
+    """
+    counter_lock = Condition()
+    state = {'counter': 0}
+
+    def target(i: int) -> None:
+        for _ in range(OPS_PER_THREAD):
+            with counter_lock:
+                state['counter'] += 1
+
+    return target
+
+
+def message_queue(n_threads: int) -> Callable[[int], None]:
+    """
+    comm_via_atomic_message_queue.worker(): every thread sends its increments
+    to a single counter manager thread through a Queue.
+    The manager thread is started here, and stops after the last increment.
+    :param n_threads: int
+    :return: callable
+    """
+    counter_queue = Queue()
+    n_messages = OPS_PER_THREAD * n_threads
+
+    def counter_manager() -> None:
+        counter = 0
+        for _ in range(n_messages):
+            counter += counter_queue.get()
+
+    manager = Thread(target=counter_manager, daemon=True)
+    manager.start()
+
+    def target(i: int) -> None:
+        for _ in range(OPS_PER_THREAD):
+            counter_queue.put(1)
+        if i == 0:
+            manager.join()
+
+    return target
+
+
+def thread_pool(n_threads: int) -> Callable[[int], None]:
+    """
+    multithreading_async.py: small tasks submitted to a shared
+    ThreadPoolExecutor of n_threads threads.
+    Here, thread 0 submits all the tasks, while the other threads do nothing.
+    :param n_threads: int
+    :return: callable
+    """
+    pool = cf.ThreadPoolExecutor(max_workers=n_threads)
+    n_tasks = n_threads * 100
+
+    def task() -> int:
+        total = 0
+        for _ in range(OPS_PER_THREAD // 100):
+            total += 1
+        return total
+
+    def target(i: int) -> None:
+        if i == 0:
+            futures = [pool.submit(task) for _ in range(n_tasks)]
+            for future in futures:
+                future.result()
+            pool.shutdown()
+
+    return target
+
+
+def false_sharing(n_threads: int) -> Callable[[int], None]:
+    """
+    Every thread increments its own slot of a shared list, so there is no
+    race, but the adjacent slots share cache lines.
+    :param n_threads: int
+    :return: callable
+    """
+    counts = [0] * n_threads
+
+    def target(i: int) -> None:
+        for _ in range(OPS_PER_THREAD):
+            counts[i] += 1
+
+    return target
+
+
+PATTERNS: Dict[str, Pattern] = {
+    'independent_work': independent_work,
+    'locked_balance': locked_balance,
+    'condition_counter': condition_counter,
+    'message_queue': message_queue,
+    'thread_pool': thread_pool,
+    'false_sharing': false_sharing,
+}
+
+
+##### Harness #####
+
+
+def measure(pattern: Pattern, n_threads: int) -> float:
+    """
+    Runs the given pattern on the given number of threads, and returns its
+    throughput in ops/sec.
+    All the threads are released at the same time by a barrier.
+    :param pattern: Pattern
+    :param n_threads: int
+    :return: float
+    """
+    target = pattern(n_threads)
+    barrier = Barrier(n_threads + 1)
+
+    def run(i: int) -> None:
+        barrier.wait()
+        target(i)
+
+    threads = [Thread(target=run, args=(i,)) for i in range(n_threads)]
+    for th in threads:
+        th.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for th in threads:
+        th.join()
+    return n_threads * OPS_PER_THREAD / (time.perf_counter() - start)
+
+
+def thread_counts(max_threads: int) -> List[int]:
+    """
+    Returns 1, 2, 4, ... up to max_threads.
+    :param max_threads: int
+    :return: list[int]
+    """
+    counts = []
+    n = 1
+    while n < max_threads:
+        counts.append(n)
+        n *= 2
+    counts.append(max_threads)
+    return counts
+
+
+def run_all(max_threads: int) -> dict:
+    """
+    Measures every pattern at every thread count in this interpreter.
+    :param max_threads: int
+    :return: dict
+    """
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    results = {
+        'python': sys.version.split()[0],
+        'gil': is_gil_enabled,
+        'patterns': {},
+    }
+    for name, pattern in PATTERNS.items():
+        measure(pattern, 1)  # Warm-up
+        results['patterns'][name] = {
+            n_threads: measure(pattern, n_threads)
+            for n_threads in thread_counts(max_threads)
+        }
+    return results
+
+
+def _speedup(curve: Dict[int, float]) -> float:
+    """
+    Private helper function to get the speedup at the largest thread count over
+    1 thread.
+    :param curve: dict{int: float}
+    :return: float
+    """
+    return curve[max(curve)] / curve[1]
+
+
+def has_parallelism(reference: Dict[int, float]) -> bool:
+    """
+    Checks whether the threads really run in parallel, i.e., the reference
+    pattern (with nothing shared) scales to at least half the ideal speedup.
+    :param reference: dict{int: float}
+    :return: bool
+    """
+    return _speedup(reference) >= 0.5 * max(reference)
+
+
+def diagnose(curve: Dict[int, float], reference: Dict[int, float]) -> str:
+    """
+    Flags a scaling curve whose throughput collapses, or which scales much worse
+    than the reference pattern.
+    :param curve: dict{int: float}
+    :param reference: dict{int: float}
+    :return: str
+    """
+    if max(curve) == 1 or not has_parallelism(reference):
+        return ''
+    speedup = _speedup(curve)
+    if speedup < 0.8:
+        return 'COLLAPSES'
+    if speedup < 0.5 * _speedup(reference):
+        return 'POOR SCALING'
+    return ''
+
+
+def print_results(results: dict) -> None:
+    """
+    Prints the scaling curves (throughput and speedup over 1 thread) of every
+    pattern, with the flags.
+    :param results: dict
+    :return: None
+    """
+    gil = 'GIL enabled' if results['gil'] else 'GIL disabled'
+    curves = {
+        name: {int(n): ops for n, ops in curve.items()}
+        for name, curve in results['patterns'].items()
+    }
+    reference = curves['independent_work']
+    print(f"Python {results['python']}, {gil}")
+    if not has_parallelism(reference):
+        print('  (No real parallelism: even independent_work does not scale, '
+              'so nothing is flagged)')
+    for name, curve in curves.items():
+        points = '  '.join(
+            f'{n}T {ops / 1e6:5.2f}M ({ops / curve[1]:4.1f}x)'
+            for n, ops in curve.items()
+        )
+        print(f'  {name:<18} {points}  {diagnose(curve, reference)}')
+
+
+def _configurations(pythons: List[str]) -> List[List[str]]:
+    """
+    Private helper function to get the command lines of the interpreter
+    configurations to compare.
+    :param pythons: list[str]
+    :return: list[list[str]]
+    """
+    configurations = []
+    for python in pythons:
+        is_free_threaded_build = subprocess.run(
+            [python, '-c',
+             'import sysconfig; '
+             'print(bool(sysconfig.get_config_var("Py_GIL_DISABLED")))'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip() == 'True'
+        if is_free_threaded_build:
+            configurations.append([python, '-X', 'gil=0'])
+            configurations.append([python, '-X', 'gil=1'])
+        else:
+            configurations.append([python])
+    return configurations
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--max-threads', type=int, default=min(os.cpu_count() or 1, 8) * 2
+    )
+    parser.add_argument(
+        '--python', action='append',
+        help='Interpreter to compare (repeatable); defaults to this one'
+    )
+    parser.add_argument(
+        '--worker', action='store_true',
+        help='Run the patterns in this interpreter, and dump the results as '
+             'JSON'
+    )
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_all(args.max_threads), sys.stdout)
+    else:
+        if not sysconfig.get_config_var('Py_GIL_DISABLED') and not args.python:
+            print('Note: not a free-threaded build; pass e.g. '
+                  '--python python3.13t to compare against one.\n')
+        for command in _configurations(args.python or [sys.executable]):
+            output = subprocess.run(
+                command + [
+                    __file__, '--worker', '--max-threads', str(args.max_threads)
+                ],
+                capture_output=True, text=True, check=True
+            ).stdout
+            print(' '.join(os.path.basename(arg) for arg in command))
+            print_results(json.loads(output))
+            print()
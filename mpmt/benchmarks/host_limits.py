@@ -0,0 +1,120 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of HostLimiter against local stand-in servers:
+- A crawl mixing good URLs with hanging, unresolvable and refusing hosts:
+  crawl time, and how many requests failed (fast)
+- A slow host followed by a fast one: when the fast one finishes, i.e., whether
+  the slow host starves it
+
+Usage:
+    python -m mpmt.benchmarks.host_limits
+"""
+
+__author__ = 'Ziang Lu'
+
+import socket
+import time
+
+from mpmt.fetching import site_sizes, streamed_site_size
+from mpmt.host_limits import CircuitOpenError, HostLimiter
+from mpmt.local_http_server import StandInServer
+
+
+def _crawl(name: str, urls: list, crawl) -> None:
+    """
+    Private helper function to crawl the given URLs with the given crawl
+    function, and report the crawl time and the number of failures.
+    :param name: str
+    :param urls: list[str]
+    :param crawl: callable
+    :return: None
+    """
+    start = time.perf_counter()
+    results = crawl(urls)
+    elapsed = time.perf_counter() - start
+    n_fast_failed = sum(isinstance(r, CircuitOpenError) for r in results)
+    n_failed = sum(isinstance(r, Exception) for r in results)
+    print(f'{name:<26} {elapsed:6.2f} s  {n_failed:>3} failed  '
+          f'({n_fast_failed} failed fast)')
+
+
+def _timed_fetch(url: str, session, finished_at: dict) -> int:
+    """
+    Private helper function to fetch the given URL, and record when it finished.
+    :param url: str
+    :param session: Session
+    :param finished_at: dict
+    :return: int
+    """
+    size = streamed_site_size(url, session)
+    finished_at[url] = time.perf_counter()
+    return size
+
+
+def _starvation(name: str, slow_urls: list, fast_urls: list, crawl) -> None:
+    """
+    Private helper function to crawl the given slow URLs followed by the given
+    fast URLs with the given crawl function (which takes the URLs and the fetch
+    function), and report when the fast ones finished.
+    :param name: str
+    :param slow_urls: list[str]
+    :param fast_urls: list[str]
+    :param crawl: callable
+    :return: None
+    """
+    finished_at = {}
+    start = time.perf_counter()
+    crawl(slow_urls + fast_urls,
+          lambda url, session, **kwargs: _timed_fetch(url, session, finished_at))
+    fast_done = max(finished_at[url] for url in fast_urls) - start
+    print(f'{name:<26} fast host done after {fast_done:6.2f} s')
+
+
+if __name__ == '__main__':
+    # A closed local port, which refuses connections
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        closed_port = sock.getsockname()[1]
+
+    with StandInServer(latency=0.02) as good_server, \
+            StandInServer(latency=5.0) as hanging_server:
+        urls = []
+        for i in range(200):
+            urls.append(f'{good_server.base_url}/{i}')
+            if i % 5 == 0:
+                urls.append(f'{hanging_server.base_url}/{i}')
+                urls.append(f'http://some-made-up-domain.invalid/{i}')
+                urls.append(f'http://127.0.0.1:{closed_port}/{i}')
+
+        _crawl(
+            'plain, no timeouts', urls,
+            lambda urls: site_sizes(urls, fetch=streamed_site_size)
+        )
+        _crawl(
+            'HostLimiter', urls,
+            HostLimiter(max_per_host=4, read_timeout=1.0).site_sizes
+        )
+        _crawl(
+            'HostLimiter, 100 req/s/host', urls,
+            HostLimiter(
+                max_per_host=4, rate_per_host=100, read_timeout=1.0
+            ).site_sizes
+        )
+
+    # A slow host must not starve a fast one
+    with StandInServer(latency=0.5) as slow_server, \
+            StandInServer(latency=0.0) as fast_server:
+        slow_urls = [f'{slow_server.base_url}/{i}' for i in range(20)]
+        fast_urls = [f'{fast_server.base_url}/{i}' for i in range(10)]
+        _starvation(
+            'plain', slow_urls, fast_urls,
+            lambda urls, fetch: site_sizes(urls, fetch=fetch)
+        )
+        _starvation(
+            'HostLimiter, 2 per host', slow_urls, fast_urls,
+            lambda urls, fetch: HostLimiter(
+                max_per_host=2, fetch=fetch
+            ).site_sizes(urls)
+        )
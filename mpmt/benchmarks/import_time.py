@@ -0,0 +1,116 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Import-time benchmark of the mpmt package.
+
+Every module is imported in a fresh interpreter (so that nothing is already
+cached in sys.modules), and the time of the import statement alone (excluding
+the interpreter startup) is reported, together with the heavy optional
+dependencies it pulled in, and the threads it left running.
+A module fails the check if it takes longer than the budget, imports a heavy
+dependency, or starts a thread at import time.
+
+Usage:
+    python -m mpmt.benchmarks.import_time [--budget-ms 50] [--repeat 5]
+"""
+
+__author__ = 'Ziang Lu'
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+MODULES = [
+    'mpmt',
+    'mpmt.batch_queue',
+    'mpmt.bounded_buffer',
+    'mpmt.distributed_locking',
+    'mpmt.fetching',
+    'mpmt.host_limits',
+    'mpmt.instrumented_locks',
+    'mpmt.local_http_server',
+    'mpmt.pools',
+    'mpmt.queue_managers',
+    'mpmt.schedule_explorer',
+    'mpmt.shm_ring_buffer',
+    'mpmt.site_size_cache',
+    'mpmt.striped_counter',
+    'mpmt.task_queue',
+    'mpmt.weighted_semaphore',
+]
+
+# Dependencies which must only be imported when actually used
+HEAVY_DEPENDENCIES = ['aiohttp', 'redis', 'redlock', 'requests']
+
+_PROBE = '''
+import json, sys, threading, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'heavy': sorted(m for m in {heavy!r} if m in sys.modules),
+    'threads': threading.active_count(),
+}}))
+'''
+
+
+def measure(module: str, repeat: int = 5) -> Dict:
+    """
+    Imports the given module in "repeat" fresh interpreters, and returns the
+    median import time in seconds, together with the heavy dependencies it
+    imported and the number of threads alive right after the import.
+    :param module: str
+    :param repeat: int
+    :return: dict
+    """
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-c',
+             _PROBE.format(module=module, heavy=HEAVY_DEPENDENCIES)],
+            capture_output=True, text=True, check=True
+        )
+        runs.append(json.loads(completed.stdout))
+    return {
+        'seconds': statistics.median(run['seconds'] for run in runs),
+        'heavy': runs[0]['heavy'],
+        'threads': runs[0]['threads'],
+    }
+
+
+def check(modules: List[str], budget: float, repeat: int = 5) -> bool:
+    """
+    Measures and reports the given modules, and returns whether they all pass.
+    :param modules: list[str]
+    :param budget: float
+    :param repeat: int
+    :return: bool
+    """
+    all_passed = True
+    for module in modules:
+        result = measure(module, repeat)
+        problems = []
+        if result['seconds'] > budget:
+            problems.append('over budget')
+        if result['heavy']:
+            problems.append(f"imports {', '.join(result['heavy'])}")
+        if result['threads'] > 1:
+            problems.append(f"{result['threads'] - 1} thread(s) started")
+        all_passed = all_passed and not problems
+        print(f"{module:<28} {result['seconds'] * 1000:7.2f} ms  "
+              f"{'; '.join(problems) or 'ok'}")
+    return all_passed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--budget-ms', type=float, default=50.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args()
+    sys.exit(0 if check(args.modules, args.budget_ms / 1000, args.repeat) else 1)
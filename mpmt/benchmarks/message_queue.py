@@ -0,0 +1,125 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the per-message vs. batched manager threads in
+comm_via_atomic_message_queue.py, in messages/sec at 1, 10 and 100 producer
+threads.
+The print()-access manager writes to os.devnull, so that the terminal speed is
+not measured.
+"""
+
+__author__ = 'Ziang Lu'
+
+import os
+import time
+from queue import Queue
+from threading import Thread
+
+from mpmt.batch_queue import BatchQueue
+
+N_MESSAGES = 300000
+
+
+def per_message_managers(counter_queue: Queue, print_queue: Queue,
+                         out) -> None:
+    """
+    Starts the original manager threads, which handle one message per get().
+    :param counter_queue: Queue
+    :param print_queue: Queue
+    :param out: file
+    :return: None
+    """
+    counter = 0
+
+    def counter_manager() -> None:
+        nonlocal counter
+        while True:
+            increment = counter_queue.get()
+            counter += increment
+            print_queue.put([f'Counter value: {counter}', '----------'])
+            counter_queue.task_done()
+
+    def print_manager() -> None:
+        while True:
+            stuff_to_print = print_queue.get()
+            for line in stuff_to_print:
+                print(line, file=out)
+            print_queue.task_done()
+
+    Thread(target=counter_manager, daemon=True).start()
+    Thread(target=print_manager, daemon=True).start()
+
+
+def batched_managers(counter_queue: BatchQueue, print_queue: BatchQueue,
+                     out) -> None:
+    """
+    Starts the batched manager threads, which drain all the pending messages in
+    one pass.
+    :param counter_queue: BatchQueue
+    :param print_queue: BatchQueue
+    :param out: file
+    :return: None
+    """
+    counter = 0
+
+    def counter_manager() -> None:
+        nonlocal counter
+        while True:
+            increments = counter_queue.get_many()
+            counter += sum(increments)
+            print_queue.put([f'Counter value: {counter}', '----------'])
+            counter_queue.task_done_many(len(increments))
+
+    def print_manager() -> None:
+        while True:
+            batch = print_queue.get_many()
+            lines = []
+            for stuff_to_print in batch:
+                lines.extend(stuff_to_print)
+            out.write('\n'.join(lines) + '\n')
+            print_queue.task_done_many(len(batch))
+
+    Thread(target=counter_manager, daemon=True).start()
+    Thread(target=print_manager, daemon=True).start()
+
+
+def run(start_managers, queue_class, n_producers: int, out) -> float:
+    """
+    Sends N_MESSAGES increments from the given number of producer threads, and
+    returns the number of messages handled per second.
+    :param start_managers: callable
+    :param queue_class: type
+    :param n_producers: int
+    :param out: file
+    :return: float
+    """
+    counter_queue, print_queue = queue_class(), queue_class()
+    start_managers(counter_queue, print_queue, out)
+    n_per_producer = N_MESSAGES // n_producers
+
+    def producer() -> None:
+        for _ in range(n_per_producer):
+            counter_queue.put(1)
+
+    start = time.perf_counter()
+    producers = [Thread(target=producer) for _ in range(n_producers)]
+    for producer_thread in producers:
+        producer_thread.start()
+    for producer_thread in producers:
+        producer_thread.join()
+    # Same join semantics as in the demo
+    counter_queue.join()
+    print_queue.join()
+    return n_per_producer * n_producers / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    with open(os.devnull, 'w') as devnull:
+        for n_producers in (1, 10, 100):
+            per_message = run(per_message_managers, Queue, n_producers, devnull)
+            batched = run(batched_managers, BatchQueue, n_producers, devnull)
+            print(f'{n_producers:>3} producers  '
+                  f'per-message {per_message:>10,.0f} msg/s  '
+                  f'batched {batched:>10,.0f} msg/s  '
+                  f'({batched / per_message:.1f}x)')
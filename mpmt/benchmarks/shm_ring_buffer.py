@@ -0,0 +1,128 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of ShmRingBuffer vs. multiprocessing.Queue between processes:
+throughput of 64-byte messages, and round-trip latency percentiles through an
+echo process.
+
+Usage:
+    python -m mpmt.benchmarks.shm_ring_buffer
+"""
+
+__author__ = 'Ziang Lu'
+
+import multiprocessing as mp
+import statistics
+import struct
+import time
+
+from mpmt.shm_ring_buffer import ShmRingBuffer
+
+N_MESSAGES = 200000
+N_ROUND_TRIPS = 5000
+_TIMESTAMPED = struct.Struct('d56x')  # 64-byte message
+
+
+def _ring_producer(channel: ShmRingBuffer) -> None:
+    """
+    Producer process function for the throughput benchmark.
+    :param channel: ShmRingBuffer
+    :return: None
+    """
+    message = _TIMESTAMPED.pack(0.0)
+    for _ in range(N_MESSAGES):
+        channel.put(message)
+
+
+def _queue_producer(channel: mp.Queue) -> None:
+    """
+    Producer process function for the throughput benchmark.
+    :param channel: Queue
+    :return: None
+    """
+    message = _TIMESTAMPED.pack(0.0)
+    for _ in range(N_MESSAGES):
+        channel.put(message)
+
+
+def _echo(requests, responses) -> None:
+    """
+    Echo process function for the latency benchmark.
+    :param requests: ShmRingBuffer or Queue
+    :param responses: ShmRingBuffer or Queue
+    :return: None
+    """
+    for _ in range(N_ROUND_TRIPS):
+        responses.put(requests.get())
+
+
+def _throughput(channel, producer) -> float:
+    """
+    Private helper function to get the messages/sec from a producer process to
+    this process through the given channel.
+    :param channel: ShmRingBuffer or Queue
+    :param producer: callable
+    :return: float
+    """
+    producer_process = mp.Process(target=producer, args=(channel,))
+    start = time.perf_counter()
+    producer_process.start()
+    for _ in range(N_MESSAGES):
+        channel.get()
+    elapsed = time.perf_counter() - start
+    producer_process.join()
+    return N_MESSAGES / elapsed
+
+
+def _round_trip_latencies(requests, responses) -> list:
+    """
+    Private helper function to get the round-trip latencies in microseconds,
+    through an echo process.
+    :param requests: ShmRingBuffer or Queue
+    :param responses: ShmRingBuffer or Queue
+    :return: list[float]
+    """
+    echo_process = mp.Process(target=_echo, args=(requests, responses))
+    echo_process.start()
+    message = _TIMESTAMPED.pack(0.0)
+    latencies = []
+    for _ in range(N_ROUND_TRIPS):
+        start = time.perf_counter()
+        requests.put(message)
+        responses.get()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    echo_process.join()
+    return latencies
+
+
+def _report(name: str, throughput: float, latencies: list) -> None:
+    """
+    Private helper function to print the benchmark results.
+    :param name: str
+    :param throughput: float
+    :param latencies: list[float]
+    :return: None
+    """
+    latencies.sort()
+    print(f'{name:<22} {throughput:>10,.0f} msg/s  '
+          f'round trip p50 {statistics.median(latencies):7.1f} us  '
+          f'p99 {latencies[int(len(latencies) * 0.99)]:7.1f} us')
+
+
+if __name__ == '__main__':
+    ring = ShmRingBuffer(slot_size=_TIMESTAMPED.size)
+    ring_requests = ShmRingBuffer(slot_size=_TIMESTAMPED.size)
+    ring_responses = ShmRingBuffer(slot_size=_TIMESTAMPED.size)
+    _report(
+        'ShmRingBuffer', _throughput(ring, _ring_producer),
+        _round_trip_latencies(ring_requests, ring_responses)
+    )
+    for channel in (ring, ring_requests, ring_responses):
+        channel.close()
+
+    queue = mp.Queue(maxsize=1024)
+    _report(
+        'multiprocessing.Queue', _throughput(queue, _queue_producer),
+        _round_trip_latencies(mp.Queue(), mp.Queue())
+    )
@@ -0,0 +1,75 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of polling the same URLs with and without SiteSizeCache, against a
+local stand-in server: time spent and body bytes downloaded, and the cache
+persisted across runs.
+
+Usage:
+    python -m mpmt.benchmarks.site_size_cache
+"""
+
+__author__ = 'Ziang Lu'
+
+import os
+import tempfile
+import time
+from typing import Optional
+
+from mpmt.fetching import site_size, site_sizes
+from mpmt.local_http_server import StandInServer
+from mpmt.site_size_cache import SiteSizeCache
+
+
+def _benchmark(name: str, n_rounds: int, n_urls: int,
+               cache: Optional[SiteSizeCache] = None,
+               max_age: Optional[int] = None) -> None:
+    """
+    Private helper function to poll the same URLs for the given number of
+    rounds, and report the time spent and the body bytes the server sent.
+    :param name: str
+    :param n_rounds: int
+    :param n_urls: int
+    :param cache: SiteSizeCache
+    :param max_age: int
+    :return: None
+    """
+    fetch = site_size if cache is None else cache.site_size
+    with StandInServer(
+        latency=0.01, body_size=500000, validators=True, max_age=max_age
+    ) as server:
+        urls = [f'{server.base_url}/{i}' for i in range(n_urls)]
+        start = time.perf_counter()
+        for _ in range(n_rounds):
+            site_sizes(urls, fetch=fetch)
+        elapsed = time.perf_counter() - start
+        print(f'{name:<28} {elapsed:6.2f} s  '
+              f'{server.body_bytes_sent / 1024 ** 2:7.1f} MB downloaded')
+    if cache is not None:
+        print(f'    {cache.stats()}')
+
+
+if __name__ == '__main__':
+    N_ROUNDS = 10
+    N_URLS = 50
+    _benchmark('no cache', N_ROUNDS, N_URLS)
+    _benchmark('revalidate every time', N_ROUNDS, N_URLS, SiteSizeCache())
+    _benchmark('max-age=60', N_ROUNDS, N_URLS, SiteSizeCache(), max_age=60)
+    # Note that polling more URLs than the LRU holds, in the same order every
+    # round, evicts every entry before it is reused
+    _benchmark(
+        'max-age=60, 20-entry LRU', N_ROUNDS, N_URLS,
+        SiteSizeCache(max_entries=20), max_age=60
+    )
+
+    # Persistence across runs
+    cache_path = os.path.join(tempfile.mkdtemp(), 'site_size_cache.json')
+    with StandInServer(validators=True, max_age=60) as server:
+        urls = [f'{server.base_url}/{i}' for i in range(N_URLS)]
+        first_run = SiteSizeCache(path=cache_path)
+        site_sizes(urls, fetch=first_run.site_size)
+        first_run.save()
+        second_run = SiteSizeCache(path=cache_path)
+        site_sizes(urls, fetch=second_run.site_size)
+        print(f'Second run after reloading from disk: {second_run.stats()}')
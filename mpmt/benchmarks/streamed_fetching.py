@@ -0,0 +1,93 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the buffered vs. streamed site size measurements in
+mpmt/fetching.py, on multi-MB responses from a local stand-in server.
+
+Every mode runs in a freshly spawned process, so that its peak RSS is not
+polluted by the other modes.
+"""
+
+__author__ = 'Ziang Lu'
+
+import asyncio
+import concurrent.futures as cf
+import functools
+import multiprocessing as mp
+import resource
+import sys
+import time
+from typing import Tuple
+
+from mpmt.local_http_server import StandInServer
+from mpmt.fetching import (
+    async_site_size, async_site_sizes, async_streamed_site_size, site_size,
+    site_sizes, streamed_site_size
+)
+
+BODY_SIZE = 8 * 1024 * 1024  # 8 MB per page
+N_REQUESTS = 40
+MAX_WORKERS = 10
+
+MODES = {
+    'buffered, 10 threads': lambda urls: site_sizes(
+        urls, max_workers=MAX_WORKERS, fetch=site_size
+    ),
+    'streamed, 10 threads': lambda urls: site_sizes(
+        urls, max_workers=MAX_WORKERS, fetch=streamed_site_size
+    ),
+    'HEAD Content-Length, 10 threads': lambda urls: site_sizes(
+        urls, max_workers=MAX_WORKERS,
+        fetch=functools.partial(streamed_site_size, trust_content_length=True)
+    ),
+    'buffered, aiohttp': lambda urls: asyncio.run(
+        async_site_sizes(urls, fetch=async_site_size)
+    ),
+    'streamed, aiohttp': lambda urls: asyncio.run(
+        async_site_sizes(urls, fetch=async_streamed_site_size)
+    ),
+}
+
+
+def _peak_rss_mb() -> float:
+    """
+    Private helper function to get the peak RSS of the current process in MB.
+    :return: float
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':  # In bytes on macOS, but in KB on Linux
+        peak /= 1024
+    return peak / 1024
+
+
+def run_mode(mode: str, base_url: str) -> Tuple[float, int, float, float]:
+    """
+    Runs the given mode against the given server.
+    :param mode: str
+    :param base_url: str
+    :return: tuple(float, int, float, float)
+    """
+    urls = [f'{base_url}/{i}' for i in range(N_REQUESTS)]
+    baseline_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    results = MODES[mode](urls)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return elapsed, sum(results), baseline_rss, _peak_rss_mb()
+
+
+if __name__ == '__main__':
+    with StandInServer(latency=0.01, body_size=BODY_SIZE) as server:
+        for mode in MODES:
+            with cf.ProcessPoolExecutor(
+                max_workers=1, mp_context=mp.get_context('spawn')
+            ) as pool:
+                elapsed, n_bytes, baseline_rss, peak_rss = pool.submit(
+                    run_mode, mode, server.base_url
+                ).result()
+            print(f'{mode:<32} {elapsed:6.2f} s  '
+                  f'{n_bytes / elapsed / 1024 ** 2:8.1f} MB/s  '
+                  f'peak RSS +{peak_rss - baseline_rss:6.1f} MB')
@@ -0,0 +1,114 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of StripedCounter vs. a single global lock, in increments/sec at 1
+to 8 threads.
+
+Usage:
+    python -m mpmt.benchmarks.striped_counter
+"""
+
+__author__ = 'Ziang Lu'
+
+import sys
+import time
+from threading import Condition, Lock, Thread
+
+from mpmt.striped_counter import StripedCounter
+
+
+def _gil_status() -> str:
+    """
+    Private helper function to describe whether the GIL is enabled.
+    :return: str
+    """
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)
+    return 'GIL enabled' if is_gil_enabled() else 'GIL disabled (free-threaded)'
+
+
+def _run(name: str, n_threads: int, n_iters: int, make_worker) -> None:
+    """
+    Private helper function to run the workers made by make_worker() on the
+    given number of threads, and report the increments per second.
+    :param name: str
+    :param n_threads: int
+    :param n_iters: int
+    :param make_worker: callable
+    :return: None
+    """
+    worker, read = make_worker(n_iters)
+    threads = [Thread(target=worker) for _ in range(n_threads)]
+    start = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - start
+    assert read() == n_threads * n_iters
+    print(f'{name:<34} {n_threads:>2} threads  '
+          f'{n_threads * n_iters / elapsed:>12,.0f} increments/s')
+
+
+def _single_lock(n_iters: int):
+    """
+    sync_blocking.thread_func() pattern: one global Lock for every increment.
+    :param n_iters: int
+    :return: tuple(callable, callable)
+    """
+    lock = Lock()
+    counter = 0
+
+    def worker() -> None:
+        nonlocal counter
+        for _ in range(n_iters):
+            with lock:
+                counter += 1
+
+    return worker, lambda: counter
+
+
+def _single_condition(n_iters: int):
+    """
+    comm_via_locks.worker() pattern: one global Condition for every increment.
+    :param n_iters: int
+    :return: tuple(callable, callable)
+    """
+    counter_lock = Condition()
+    counter = 0
+
+    def worker() -> None:
+        nonlocal counter
+        for _ in range(n_iters):
+            with counter_lock:
+                counter += 1
+
+    return worker, lambda: counter
+
+
+def _striped(n_iters: int):
+    """
+    StripedCounter.add() for every increment.
+    :param n_iters: int
+    :return: tuple(callable, callable)
+    """
+    counter = StripedCounter()
+
+    def worker() -> None:
+        add = counter.add
+        for _ in range(n_iters):
+            add()
+
+    return worker, counter.value
+
+
+if __name__ == '__main__':
+    N_ITERS = 200000
+    print(_gil_status())
+    for n_threads in (1, 2, 4, 8):
+        _run('single Lock (sync_blocking)', n_threads, N_ITERS, _single_lock)
+        _run(
+            'single Condition (comm_via_locks)', n_threads, N_ITERS,
+            _single_condition
+        )
+        _run('StripedCounter', n_threads, N_ITERS, _striped)
@@ -0,0 +1,160 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of a greedy weighted semaphore vs. WeightedSemaphore and
+AsyncWeightedSemaphore, under a mix of light and heavy callers: acquire latency
+percentiles of every weight class, and how many missed their deadline.
+
+Usage:
+    python -m mpmt.benchmarks.weighted_semaphore
+"""
+
+__author__ = 'Ziang Lu'
+
+import asyncio
+import random
+import statistics
+import time
+from threading import Condition, Thread
+from typing import Dict, Optional
+
+from mpmt.weighted_semaphore import (
+    FIFO, PRIORITY, AsyncWeightedSemaphore, WeightedSemaphore
+)
+
+
+class _GreedyWeightedSemaphore:
+    """
+    Naive weighted semaphore without any ordering: whoever fits when woken up
+    takes the units.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Constructor with parameter.
+        :param capacity: int
+        """
+        self._available = capacity
+        self._condition = Condition()
+
+    def acquire(self, weight: int = 1, timeout: Optional[float] = None,
+                priority: int = 0) -> bool:
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._available >= weight, timeout
+            ):
+                return False
+            self._available -= weight
+            return True
+
+    def release(self, weight: int = 1) -> None:
+        with self._condition:
+            self._available += weight
+            self._condition.notify_all()
+
+
+DURATION = 3.0
+CAPACITY = 10
+N_LIGHT, LIGHT_WEIGHT = 12, 1
+N_HEAVY, HEAVY_WEIGHT = 3, 8
+HOLD_TIME = 0.002
+DEADLINE = 0.5
+
+
+def _load(semaphore) -> Dict[str, list]:
+    """
+    Private helper function to put mixed-weight load on the given semaphore for
+    DURATION seconds, and collect the acquire latencies of every weight class.
+    Acquires which miss the DEADLINE are recorded as DEADLINE.
+    :param semaphore: semaphore
+    :return: dict{str: list[float]}
+    """
+    latencies = {'light': [], 'heavy': []}
+    stop_at = time.monotonic() + DURATION
+
+    def caller(kind: str, weight: int, priority: int) -> None:
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            acquired = semaphore.acquire(weight, DEADLINE, priority)
+            latencies[kind].append(time.perf_counter() - start)
+            if acquired:
+                time.sleep(HOLD_TIME * random.uniform(0.5, 1.5))
+                semaphore.release(weight)
+
+    # In priority mode, the heavy callers go first
+    threads = [
+        Thread(target=caller, args=('light', LIGHT_WEIGHT, 1))
+        for _ in range(N_LIGHT)
+    ] + [
+        Thread(target=caller, args=('heavy', HEAVY_WEIGHT, 0))
+        for _ in range(N_HEAVY)
+    ]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return latencies
+
+
+async def _async_load(semaphore: AsyncWeightedSemaphore) -> Dict[str, list]:
+    """
+    asyncio version of _load().
+    :param semaphore: AsyncWeightedSemaphore
+    :return: dict{str: list[float]}
+    """
+    latencies = {'light': [], 'heavy': []}
+    stop_at = time.monotonic() + DURATION
+
+    async def caller(kind: str, weight: int) -> None:
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            acquired = await semaphore.acquire(weight, DEADLINE)
+            latencies[kind].append(time.perf_counter() - start)
+            if acquired:
+                await asyncio.sleep(HOLD_TIME * random.uniform(0.5, 1.5))
+                semaphore.release(weight)
+
+    await asyncio.gather(
+        *[caller('light', LIGHT_WEIGHT) for _ in range(N_LIGHT)],
+        *[caller('heavy', HEAVY_WEIGHT) for _ in range(N_HEAVY)]
+    )
+    return latencies
+
+
+def _report(name: str, latencies: Dict[str, list]) -> None:
+    """
+    Private helper function to print the acquire latency percentiles of every
+    weight class.
+    :param name: str
+    :param latencies: dict{str: list[float]}
+    :return: None
+    """
+    print(name)
+    for kind, samples in latencies.items():
+        samples.sort()
+        p99 = samples[int(len(samples) * 0.99)]
+        n_missed = sum(sample >= DEADLINE for sample in samples)
+        print(f'  {kind:<6} {len(samples):>6} acquires  '
+              f'p50 {statistics.median(samples) * 1e3:7.2f} ms  '
+              f'p99 {p99 * 1e3:7.2f} ms  '
+              f'max {samples[-1] * 1e3:7.2f} ms  '
+              f'{n_missed} missed the deadline')
+
+
+if __name__ == '__main__':
+    _report('greedy (no ordering)', _load(_GreedyWeightedSemaphore(CAPACITY)))
+    fifo = WeightedSemaphore(CAPACITY)
+    _report('WeightedSemaphore, FIFO', _load(fifo))
+    print(f'  {fifo.stats()}')
+    # Note that strict priority starves the lower-priority callers under
+    # sustained load
+    _report(
+        'WeightedSemaphore, heavy first',
+        _load(WeightedSemaphore(CAPACITY, policy=PRIORITY))
+    )
+    async_fifo = AsyncWeightedSemaphore(CAPACITY, FIFO)
+    _report(
+        'AsyncWeightedSemaphore, FIFO', asyncio.run(_async_load(async_fifo))
+    )
+    print(f'  {async_fifo.stats()}')
@@ -0,0 +1,206 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bounded multi-slot buffer for multiple producers and multiple consumers.
+
+In wait_blocking.py, the producer and the consumer trade a single "product"
+slot through a single Condition, so every item costs a full handoff and two
+wakeups.
+Instead, BoundedBuffer holds up to "capacity" items, and uses two Conditions
+sharing one lock:
+- not_full: producers wait on it while the buffer is full
+- not_empty: consumers wait on it while the buffer is empty
+so that a producer only wakes up consumers and vice versa, and both sides keep
+working as long as the buffer is neither full nor empty.
+
+put_many() and get_many() move a batch of items under a single lock
+acquisition.
+close() stops accepting new items, while the consumers can still drain the
+remaining ones; after that, get() raises BufferClosed.
+"""
+
+__author__ = 'Ziang Lu'
+
+import time
+from collections import deque
+from queue import Empty, Full
+from threading import Condition, Lock
+from typing import Iterable, Optional
+
+
+class BufferClosed(Exception):
+    """
+    Raised when putting into a closed buffer, or getting from a closed and
+    drained buffer.
+    When raised by put_many(), n_put is the number of items which were put
+    before the buffer was closed.
+    """
+
+    def __init__(self, *args, n_put: int = 0):
+        """
+        Constructor with parameter.
+        :param args: tuple
+        :param n_put: int
+        """
+        super().__init__(*args)
+        self.n_put = n_put
+
+
+class BoundedBuffer:
+    """
+    Thread-safe bounded buffer with batch operations, timeouts and close/drain
+    semantics.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Constructor with parameter.
+        :param capacity: int
+        """
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        self._capacity = capacity
+        self._items = deque()
+        self._closed = False
+        lock = Lock()
+        self._not_full = Condition(lock)
+        self._not_empty = Condition(lock)
+
+    @property
+    def capacity(self) -> int:
+        """
+        Accessor of capacity.
+        :return: int
+        """
+        return self._capacity
+
+    @property
+    def closed(self) -> bool:
+        """
+        Accessor of closed.
+        :return: bool
+        """
+        return self._closed
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item, timeout: Optional[float] = None) -> None:
+        """
+        Puts the given item, blocking while the buffer is full.
+        Raises queue.Full on timeout, or BufferClosed if the buffer is closed.
+        :param item: object
+        :param timeout: float
+        :return: None
+        """
+        with self._not_full:
+            if not self._not_full.wait_for(self._has_space, timeout):
+                raise Full
+            if self._closed:
+                raise BufferClosed
+            self._items.append(item)
+            self._not_empty.notify()
+
+    def put_many(self, items: Iterable, timeout: Optional[float] = None) -> int:
+        """
+        Puts the given items in order, as many as fit at a time, blocking while
+        the buffer is full.
+        Raises BufferClosed if the buffer is closed, with the number of items
+        put before that as its n_put.
+        :param items: iterable
+        :param timeout: float
+        :return: int number of items put, which is less than the number of the
+                 given items only on timeout
+        """
+        items = list(items)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        n_put = 0
+        with self._not_full:
+            while n_put < len(items):
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                if not self._not_full.wait_for(self._has_space, remaining):
+                    break
+                if self._closed:
+                    raise BufferClosed(
+                        f'Buffer closed after {n_put} of {len(items)} items',
+                        n_put=n_put
+                    )
+                n = min(self._capacity - len(self._items), len(items) - n_put)
+                self._items.extend(items[n_put:n_put + n])
+                n_put += n
+                self._not_empty.notify(n)
+        return n_put
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Gets an item, blocking while the buffer is empty.
+        Raises queue.Empty on timeout, or BufferClosed if the buffer is closed
+        and drained.
+        :param timeout: float
+        :return: object
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(self._has_items, timeout):
+                raise Empty
+            if not self._items:
+                raise BufferClosed
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+    def get_many(self, max_items: int, timeout: Optional[float] = None) -> list:
+        """
+        Gets at least 1 and at most max_items items, blocking while the buffer is
+        empty.
+        Raises queue.Empty on timeout, or BufferClosed if the buffer is closed
+        and drained.
+        :param max_items: int
+        :param timeout: float
+        :return: list
+        """
+        if max_items < 1:
+            raise ValueError('max_items must be at least 1')
+        with self._not_empty:
+            if not self._not_empty.wait_for(self._has_items, timeout):
+                raise Empty
+            if not self._items:
+                raise BufferClosed
+            n = min(max_items, len(self._items))
+            batch = [self._items.popleft() for _ in range(n)]
+            self._not_full.notify(n)
+            return batch
+
+    def close(self) -> None:
+        """
+        Closes the buffer: no more items can be put, and all the waiting
+        producers and consumers are woken up.
+        The remaining items can still be drained.
+        :return: None
+        """
+        with self._not_full:
+            self._closed = True
+            self._not_full.notify_all()
+            self._not_empty.notify_all()
+
+    def __iter__(self):
+        """
+        Drains the buffer until it is closed and empty.
+        :return: generator
+        """
+        while True:
+            try:
+                yield self.get()
+            except BufferClosed:
+                return
+
+    def _has_space(self) -> bool:
+        # Also true when closed, so that the waiting producers wake up and fail
+        return self._closed or len(self._items) < self._capacity
+
+    def _has_items(self) -> bool:
+        # Also true when closed, so that the waiting consumers wake up and
+        # finish draining
+        return self._closed or bool(self._items)
@@ -11,10 +11,10 @@ We can use Redis's single-threaded feature to
 2. Use a third-party library
    Complex but perfect
    => Works for high-concurrent scenarios
-"""
 
-import redis
-from redlock import MultipleRedlockException, Redlock
+redis and redlock are imported inside the functions, so that importing this
+module neither requires them to be installed nor pays for importing them.
+"""
 
 LOCK_KEY = 'lock'
 
@@ -24,6 +24,8 @@ def set_up() -> None:
     Stock setup.
     :return: None
     """
+    import redis
+
     r = redis.Redis()
 
     r.set('stock', 10)
@@ -34,6 +36,8 @@ def lightning_order() -> None:
     Lightning order.
     :return: None
     """
+    import redis
+
     r = redis.Redis()
 
     # Use a "lock" key as the lock
@@ -96,6 +100,9 @@ def lightning_order_with_redlock() -> None:
     Lightning order with Redlock algorithm.
     :return: None
     """
+    import redis
+    from redlock import MultipleRedlockException, Redlock
+
     r = redis.Redis()
 
     dlm = Redlock([{
@@ -0,0 +1,265 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pooled, keep-alive HTTP fetching.
+
+A bare requests.get(url) creates a brand-new Session for every call, so every
+URL pays for a new TCP (and TLS) handshake.
+Instead,
+1. Share one requests.Session, with a sized connection pool per host, across
+   all the threads in the thread pool
+   urllib3's connection pools are thread-safe, so every thread simply checks out
+   a kept-alive connection, uses it, and puts it back.
+2. Use an asyncio variant (aiohttp), which drives thousands of concurrent
+   fetches within a single thread
+
+len(response.content) also buffers the whole page in memory, so a crawl over
+large pages can spike the memory usage.
+Therefore, there are also streamed variants, which count the bytes chunk by
+chunk (or, if allowed, trust the Content-Length from a HEAD request), so that
+the memory usage per in-flight request stays constant.
+"""
+
+__author__ = 'Ziang Lu'
+
+import concurrent.futures as cf
+from threading import Lock
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    # requests and aiohttp are only imported when a fetch function first needs
+    # them, so that importing this module stays cheap
+    import aiohttp
+    import requests
+
+POOL_CONNECTIONS = 10  # Number of per-host connection pools to keep
+POOL_MAXSIZE = 10  # Number of kept-alive connections per host
+CHUNK_SIZE = 64 * 1024  # Bytes held in memory per in-flight streamed request
+
+
+def make_session(pool_connections: int = POOL_CONNECTIONS,
+                 pool_maxsize: int = POOL_MAXSIZE,
+                 pool_block: bool = False) -> 'requests.Session':
+    """
+    Creates a session whose connection pools are of the given sizes.
+    pool_maxsize should be at least the number of threads sharing the session,
+    otherwise the extra connections are simply discarded after use (or, if
+    pool_block is True, the extra threads wait for a free connection).
+    :param pool_connections: int
+    :param pool_maxsize: int
+    :param pool_block: bool
+    :return: Session
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+        pool_block=pool_block
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_session = None
+_session_lock = Lock()
+
+
+def get_session() -> 'requests.Session':
+    """
+    Returns the process-wide shared session, creating it on first use.
+    :return: Session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = make_session()
+    return _session
+
+
+def site_size(url: str, session: Optional['requests.Session'] = None,
+              timeout=None) -> int:
+    """
+    Returns the page size in bytes of the given URL, fetched over a pooled,
+    kept-alive connection.
+    timeout is either a single number, or a (connect timeout, read timeout)
+    tuple, as in requests.
+    :param url: str
+    :param session: Session
+    :param timeout: float or tuple(float, float)
+    :return: int
+    """
+    if session is None:
+        session = get_session()
+    response = session.get(url, timeout=timeout)
+    return len(response.content)
+
+
+def streamed_site_size(url: str,
+                       session: Optional['requests.Session'] = None,
+                       chunk_size: int = CHUNK_SIZE,
+                       trust_content_length: bool = False,
+                       timeout=None) -> int:
+    """
+    Returns the page size in bytes of the given URL, without buffering the whole
+    page in memory.
+    If trust_content_length is True, the Content-Length from a HEAD request is
+    used whenever the server provides one, and the body is never downloaded.
+    :param url: str
+    :param session: Session
+    :param chunk_size: int
+    :param trust_content_length: bool
+    :param timeout: float or tuple(float, float)
+    :return: int
+    """
+    if session is None:
+        session = get_session()
+    if trust_content_length:
+        content_length = _head_content_length(session, url, timeout)
+        if content_length is not None:
+            return content_length
+    with session.get(url, stream=True, timeout=timeout) as response:
+        # iter_content() decodes the body the same way as response.content
+        return sum(len(chunk) for chunk in response.iter_content(chunk_size))
+
+
+def _head_content_length(session: 'requests.Session', url: str,
+                         timeout=None) -> Optional[int]:
+    """
+    Private helper function to get the Content-Length of the given URL from a
+    HEAD request, if it can be trusted as the page size.
+    :param session: Session
+    :param url: str
+    :param timeout: float or tuple(float, float)
+    :return: int or None
+    """
+    response = session.head(url, allow_redirects=True, timeout=timeout)
+    if not response.ok or 'Content-Encoding' in response.headers:
+        # For an encoded (e.g., gzip) body, Content-Length is the encoded size,
+        # rather than the decoded page size
+        return None
+    content_length = response.headers.get('Content-Length', '')
+    if not content_length.isdigit():
+        return None
+    return int(content_length)
+
+
+def site_sizes(urls: List[str], max_workers: int = 10,
+               session: Optional['requests.Session'] = None,
+               fetch=site_size) -> list:
+    """
+    Fetches the page sizes of the given URLs in a thread pool sharing one
+    session, using the given fetch function (site_size() or
+    streamed_site_size()).
+    The result for each URL is either its page size or the exception it raised,
+    in the same order as the URLs.
+    Without a given session, the shared session is used, so that repeated calls
+    reuse its kept-alive connections; only if max_workers exceeds its pool size,
+    a session with a large enough pool is made for (and closed after) this call.
+    :param urls: list[str]
+    :param max_workers: int
+    :param session: Session
+    :param fetch: callable
+    :return: list
+    """
+    if session is not None:
+        return _fetch_all(urls, max_workers, session, fetch)
+    if max_workers <= POOL_MAXSIZE:
+        return _fetch_all(urls, max_workers, get_session(), fetch)
+    with make_session(pool_maxsize=max_workers) as session:
+        return _fetch_all(urls, max_workers, session, fetch)
+
+
+def _fetch_all(urls: List[str], max_workers: int, session: 'requests.Session',
+               fetch) -> list:
+    """
+    Private helper function to fetch the page sizes of the given URLs in a
+    thread pool sharing the given session.
+    :param urls: list[str]
+    :param max_workers: int
+    :param session: Session
+    :param fetch: callable
+    :return: list
+    """
+    with cf.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fetch, url, session) for url in urls]
+        return [_result_or_exception(future) for future in futures]
+
+
+def _result_or_exception(future: cf.Future):
+    """
+    Private helper function to get the result of the given future, or the
+    exception it raised.
+    :param future: Future
+    :return: object
+    """
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+
+##### Asyncio variant #####
+
+
+async def async_site_size(session: 'aiohttp.ClientSession', url: str) -> int:
+    """
+    Returns the page size in bytes of the given URL.
+    :param session: ClientSession
+    :param url: str
+    :return: int
+    """
+    async with session.get(url) as response:
+        return len(await response.read())
+
+
+async def async_streamed_site_size(session: 'aiohttp.ClientSession',
+                                   url: str,
+                                   chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Returns the page size in bytes of the given URL, without buffering the whole
+    page in memory.
+    :param session: ClientSession
+    :param url: str
+    :param chunk_size: int
+    :return: int
+    """
+    async with session.get(url) as response:
+        size = 0
+        async for chunk in response.content.iter_chunked(chunk_size):
+            size += len(chunk)
+        return size
+
+
+async def async_site_sizes(urls: List[str], limit: int = 1000,
+                           limit_per_host: int = 0,
+                           fetch=async_site_size) -> list:
+    """
+    Concurrently fetches the page sizes of the given URLs within the current
+    thread, using the given fetch coroutine function (async_site_size() or
+    async_streamed_site_size()).
+    The result for each URL is either its page size or the exception it raised,
+    in the same order as the URLs.
+    :param urls: list[str]
+    :param limit: int
+    :param limit_per_host: int
+    :param fetch: coroutine function
+    :return: list
+    """
+    # The connector is aiohttp's connection pool: "limit" caps the total number
+    # of connections, and "limit_per_host" caps the number per host (0 means no
+    # cap)
+    import asyncio
+
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(
+            *[fetch(session, url) for url in urls],
+            return_exceptions=True
+        )
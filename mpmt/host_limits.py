@@ -0,0 +1,610 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Per-host concurrency limits, rate limiting and fast-fail for dead hosts.
+
+With a plain thread pool, one host can take all the threads, and every request
+to an unreachable host ties up a thread until its DNS lookup or connection
+fails.
+Instead, guard every request with the state of its host:
+1. A per-host cap on the number of concurrent requests to the host
+   HostLimiter.site_sizes() keeps a queue of URLs per host, and only hands a
+   URL to the thread pool once its host has a free slot, so that a slow host
+   never ties up the threads that the other hosts could use.
+2. A per-host token bucket caps the request rate to the host
+3. A negative DNS cache remembers the failed resolutions, so that a made-up
+   domain is only looked up once
+   (The successful resolutions are left to the OS resolver and urllib3, which
+   do the actual connecting.)
+4. A per-host circuit breaker fails fast once the host has failed repeatedly,
+   and lets a single trial request through after a cool-down period
+5. Separate connect and read timeouts bound how long a bad host can hold a
+   thread
+"""
+
+__author__ = 'Ziang Lu'
+
+import concurrent.futures as cf
+import socket
+import time
+from collections import OrderedDict, deque
+from threading import BoundedSemaphore, Lock
+from typing import TYPE_CHECKING, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from mpmt.fetching import (
+    POOL_MAXSIZE, get_session, make_session, streamed_site_size
+)
+
+if TYPE_CHECKING:
+    import requests
+
+# How often the dispatcher checks a host whose slots are all held by other
+# callers of the same HostLimiter
+_POLL_INTERVAL = 0.01
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a request is failed fast because the circuit of its host is
+    open.
+    """
+    pass
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket, which refills at "rate" tokens per second, up to
+    "capacity" tokens.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Constructor with parameter.
+        :param rate: float
+        :param capacity: float
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if capacity is None:
+            capacity = max(rate, 1.0)
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = self._capacity
+        self._last_refill = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Takes the given number of tokens, blocking until they are available.
+        :param tokens: float
+        :return: None
+        """
+        while True:
+            wait_time = self.try_acquire(tokens)
+            if not wait_time:
+                return
+            # Sleep outside the lock, so that the other threads can still check
+            time.sleep(wait_time)
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Takes the given number of tokens if they are available, without
+        blocking.
+        :param tokens: float
+        :return: float 0 if the tokens were taken, otherwise the time in seconds
+                 until they are available
+        """
+        if tokens > self._capacity:
+            # The bucket never holds that many tokens
+            raise ValueError(
+                f'Cannot take {tokens} tokens from a bucket of capacity '
+                f'{self._capacity}'
+            )
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity,
+                self._tokens + (now - self._last_refill) * self._rate
+            )
+            self._last_refill = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self._rate
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+    - CLOSED: requests go through; after "failure_threshold" consecutive
+      failures, the circuit opens
+    - OPEN: requests fail fast; after "reset_timeout" seconds, the circuit
+      becomes half-open
+    - HALF_OPEN: a single trial request goes through; its success closes the
+      circuit, while its failure opens the circuit again
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 3,
+                 reset_timeout: float = 30.0):
+        """
+        Constructor with parameter.
+        :param failure_threshold: int
+        :param reset_timeout: float
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._n_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Accessor of state.
+        :return: str
+        """
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        Checks whether a request may go through, and raises CircuitOpenError
+        if not.
+        :return: None
+        """
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self._reset_timeout:
+                    raise CircuitOpenError('Circuit is open')
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError('Circuit is half-open')
+                self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        """
+        Records a successful request.
+        :return: None
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._n_failures = 0
+            self._trial_in_flight = False
+
+    def end_trial(self) -> None:
+        """
+        Ends a request which failed for a reason other than the host (e.g., an
+        invalid URL, or an interrupt), so that it counts neither as a success
+        nor as a failure, but lets the next half-open trial through.
+        :return: None
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """
+        Records a failed request.
+        :return: None
+        """
+        with self._lock:
+            self._n_failures += 1
+            if (self._state == self.HALF_OPEN or
+                    self._n_failures >= self._failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class DNSCache:
+    """
+    Thread-safe negative DNS cache: it remembers the hosts whose resolution
+    failed, so that the requests to them fail right away, without another
+    lookup.
+    Only the failures are cached: a successful resolution would not be used by
+    urllib3, which resolves the host again when connecting, so caching it would
+    only add a lookup.
+    """
+
+    def __init__(self, negative_ttl: float = 30.0):
+        """
+        Constructor with parameter.
+        :param negative_ttl: float
+        """
+        self._negative_ttl = negative_ttl
+        self._failures = {}  # {host: (expires, gaierror)}
+        self._lock = Lock()
+
+    def check(self, host: str) -> None:
+        """
+        Raises the cached socket.gaierror of the given host, if its resolution
+        failed recently.
+        :param host: str
+        :return: None
+        """
+        with self._lock:
+            entry = self._failures.get(host)
+            if entry is not None and time.monotonic() >= entry[0]:
+                del self._failures[host]
+                entry = None
+        if entry is not None:
+            raise socket.gaierror(*entry[1].args)
+
+    def record_failure(self, host: str, error: socket.gaierror) -> None:
+        """
+        Caches the given failed resolution of the given host.
+        :param host: str
+        :param error: gaierror
+        :return: None
+        """
+        with self._lock:
+            self._failures[host] = (time.monotonic() + self._negative_ttl, error)
+
+
+def _resolution_failure(exc: BaseException) -> Optional[socket.gaierror]:
+    """
+    Private helper function to find the socket.gaierror behind the given
+    exception raised by requests, if the request failed to resolve its host.
+    requests wraps it in a ConnectionError, around urllib3's MaxRetryError,
+    around urllib3's NameResolutionError (or NewConnectionError).
+    :param exc: BaseException
+    :return: gaierror or None
+    """
+    seen = set()
+    pending = [exc]
+    while pending:
+        exc = pending.pop()
+        if exc is None or id(exc) in seen:
+            continue
+        seen.add(id(exc))
+        if isinstance(exc, socket.gaierror):
+            return exc
+        pending.extend([exc.__cause__, exc.__context__,
+                        getattr(exc, 'reason', None)])
+        pending.extend(arg for arg in exc.args
+                       if isinstance(arg, BaseException))
+    return None
+
+
+class _HostState:
+    """
+    Concurrency limit, rate limit and circuit breaker of a single host.
+    """
+
+    def __init__(self, max_per_host: int, rate_per_host: Optional[float],
+                 burst_per_host: Optional[float], failure_threshold: int,
+                 reset_timeout: float):
+        """
+        Constructor with parameter.
+        :param max_per_host: int
+        :param rate_per_host: float
+        :param burst_per_host: float
+        :param failure_threshold: int
+        :param reset_timeout: float
+        """
+        self.semaphore = BoundedSemaphore(max_per_host)
+        self.bucket = None
+        if rate_per_host is not None:
+            self.bucket = TokenBucket(rate_per_host, burst_per_host)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+
+def _is_host_failure(exc: BaseException) -> bool:
+    """
+    Private helper function to check whether the given exception counts against
+    the host: any requests exception (connection errors, timeouts, broken or
+    undecodable bodies, redirect loops...), except the ones caused by the URL
+    itself, and DNS failures.
+    requests is imported here, rather than at the top of the module, so that
+    importing this module does not pull it in.
+    :param exc: BaseException
+    :return: bool
+    """
+    import requests
+    from requests.exceptions import (
+        InvalidSchema, InvalidURL, MissingSchema, URLRequired
+    )
+
+    if isinstance(exc, (InvalidSchema, InvalidURL, MissingSchema,
+                        URLRequired)):
+        return False
+    return isinstance(exc, (requests.RequestException, socket.gaierror))
+
+
+def _cached_resolution_failure(hostname: str,
+                               error: socket.gaierror) -> Exception:
+    """
+    Private helper function to wrap the given cached failed resolution in the
+    same requests.ConnectionError as the original failure, so that the callers
+    handle both in the same way.
+    :param hostname: str
+    :param error: gaierror
+    :return: ConnectionError
+    """
+    import requests
+
+    return requests.ConnectionError(
+        f'Failed to resolve {hostname!r} (cached): {error}'
+    )
+
+
+def _host_of(url: str) -> tuple:
+    """
+    Private helper function to get the host name and the "host:port" of the
+    given URL.
+    :param url: str
+    :return: tuple(str, str)
+    """
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return parts.hostname, f'{parts.hostname}:{port}'
+
+
+class HostLimiter:
+    """
+    Guards the requests of a site size fetcher with per-host limits, a negative
+    DNS cache and per-host circuit breakers.
+    """
+    def __init__(self, max_per_host: int = 2,
+                 rate_per_host: Optional[float] = None,
+                 burst_per_host: Optional[float] = None,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 dns_cache: Optional[DNSCache] = None,
+                 fetch=streamed_site_size):
+        """
+        Constructor with parameter.
+        fetch is the underlying site size fetcher, like site_size(),
+        streamed_site_size() or SiteSizeCache.site_size(), which accepts a
+        "timeout" keyword argument.
+        :param max_per_host: int
+        :param rate_per_host: float
+        :param burst_per_host: float
+        :param failure_threshold: int
+        :param reset_timeout: float
+        :param connect_timeout: float
+        :param read_timeout: float
+        :param dns_cache: DNSCache
+        :param fetch: callable
+        """
+        self._max_per_host = max_per_host
+        self._rate_per_host = rate_per_host
+        self._burst_per_host = burst_per_host
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._timeout = (connect_timeout, read_timeout)
+        self._dns_cache = dns_cache if dns_cache is not None else DNSCache()
+        self._fetch = fetch
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = Lock()
+
+    def site_size(self, url: str,
+                  session: Optional['requests.Session'] = None) -> int:
+        """
+        Returns the page size in bytes of the given URL, subject to the limits
+        of its host.
+        This blocks the calling thread while its host is at its limits: to crawl
+        many URLs on a thread pool, use site_sizes() instead, which never hands
+        a URL to a thread before its host has a free slot.
+        :param url: str
+        :param session: Session
+        :return: int
+        """
+        hostname, host = _host_of(url)
+        host_state = self._host_state(host)
+        with host_state.semaphore:
+            if host_state.bucket is not None:
+                host_state.bucket.acquire()
+            return self._guarded_fetch(url, session, hostname, host_state)
+
+    def site_sizes(self, urls: List[str], max_workers: int = 10,
+                   session: Optional['requests.Session'] = None) -> list:
+        """
+        Fetches the page sizes of the given URLs in a thread pool, subject to
+        the limits of their hosts.
+        The URLs wait in a queue per host, and a URL is only handed to the
+        thread pool once its host has a free slot (and a token, if rate-limited),
+        so that the threads are never blocked on a busy host while the URLs of
+        the other hosts wait.
+        The result for each URL is either its page size or the exception it
+        raised, in the same order as the URLs.
+        :param urls: list[str]
+        :param max_workers: int
+        :param session: Session
+        :return: list
+        """
+        if session is not None:
+            return self._dispatch(urls, max_workers, session)
+        if max_workers <= POOL_MAXSIZE:
+            return self._dispatch(urls, max_workers, get_session())
+        with make_session(pool_maxsize=max_workers) as session:
+            return self._dispatch(urls, max_workers, session)
+
+    def _dispatch(self, urls: List[str], max_workers: int,
+                  session: 'requests.Session') -> list:
+        """
+        Private helper method to fetch the page sizes of the given URLs in a
+        thread pool, dispatching the URLs of every host as its slots free up.
+        :param urls: list[str]
+        :param max_workers: int
+        :param session: Session
+        :return: list
+        """
+        results = [None] * len(urls)
+        queues = OrderedDict()  # {host: deque of (index, URL)}
+        for i, url in enumerate(urls):
+            try:
+                host = _host_of(url)
+            except ValueError as e:  # E.g., an invalid port
+                results[i] = e
+                continue
+            queues.setdefault(host, deque()).append((i, url))
+        in_flight = {}  # {future: (index, host)}
+        with cf.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while queues or in_flight:
+                wait_time = None  # Until the next host may have a free slot
+                hosts_in_flight = {host for _, host in in_flight.values()}
+                for host in list(queues):
+                    host_state = self._host_state(host[1])
+                    wait_time = _min_wait(wait_time, self._dispatch_host(
+                        pool, session, queues[host], host, host_state,
+                        in_flight, max_workers, host in hosts_in_flight
+                    ))
+                    if not queues[host]:
+                        del queues[host]
+                if not in_flight:
+                    time.sleep(wait_time)
+                    continue
+                done, _ = cf.wait(
+                    in_flight, timeout=wait_time,
+                    return_when=cf.FIRST_COMPLETED
+                )
+                for future in done:
+                    i, _ = in_flight.pop(future)
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        results[i] = e
+        return results
+
+    def _dispatch_host(self, pool: cf.ThreadPoolExecutor,
+                       session: 'requests.Session', queue: deque, host: tuple,
+                       host_state: _HostState, in_flight: dict,
+                       max_workers: int,
+                       host_in_flight: bool) -> Optional[float]:
+        """
+        Private helper method to hand the queued URLs of the given host to the
+        thread pool, as long as the host has free slots and the pool has idle
+        threads.
+        :param pool: ThreadPoolExecutor
+        :param session: Session
+        :param queue: deque
+        :param host: tuple(str, str)
+        :param host_state: _HostState
+        :param in_flight: dict
+        :param max_workers: int
+        :param host_in_flight: bool
+        :return: float or None time in seconds after which to check the host
+                 again, or None if it is enough to check it when one of the
+                 in-flight requests completes
+        """
+        while queue and len(in_flight) < max_workers:
+            if not host_state.semaphore.acquire(blocking=False):
+                # If none of the slots is ours, no completion will tell us when
+                # one frees up
+                return None if host_in_flight else _POLL_INTERVAL
+            if host_state.bucket is not None:
+                wait_time = host_state.bucket.try_acquire()
+                if wait_time:
+                    host_state.semaphore.release()
+                    return wait_time
+            i, url = queue.popleft()
+            future = pool.submit(
+                self._fetch_in_slot, url, session, host[0], host_state
+            )
+            in_flight[future] = (i, host)
+            host_in_flight = True
+        return None
+
+    def _fetch_in_slot(self, url: str, session: 'requests.Session',
+                       hostname: str, host_state: _HostState) -> int:
+        """
+        Private helper method to fetch the given URL, whose host slot was
+        acquired by the dispatcher, and release the slot afterwards.
+        :param url: str
+        :param session: Session
+        :param hostname: str
+        :param host_state: _HostState
+        :return: int
+        """
+        try:
+            return self._guarded_fetch(url, session, hostname, host_state)
+        finally:
+            host_state.semaphore.release()
+
+    def _guarded_fetch(self, url: str, session: Optional['requests.Session'],
+                       hostname: str, host_state: _HostState) -> int:
+        """
+        Private helper method to fetch the given URL behind the circuit breaker
+        of its host and the negative DNS cache.
+        :param url: str
+        :param session: Session
+        :param hostname: str
+        :param host_state: _HostState
+        :return: int
+        """
+        if session is None:
+            session = get_session()
+        host_state.breaker.before_call()
+        try:
+            # A cached failed resolution fails right here, without a lookup
+            # (and without extending the cache entry, so that the host is
+            # looked up again once it expires)
+            self._dns_cache.check(hostname)
+        except socket.gaierror as e:
+            host_state.breaker.record_failure()
+            raise _cached_resolution_failure(hostname, e) from e
+        try:
+            size = self._fetch(url, session, timeout=self._timeout)
+        except BaseException as e:
+            if not _is_host_failure(e):
+                # Not the host's fault, but a half-open trial must still end
+                host_state.breaker.end_trial()
+                raise
+            resolution_failure = _resolution_failure(e)
+            if resolution_failure is not None:
+                self._dns_cache.record_failure(hostname, resolution_failure)
+            host_state.breaker.record_failure()
+            raise
+        host_state.breaker.record_success()
+        return size
+
+    def breaker_state(self, host: str) -> str:
+        """
+        Returns the circuit breaker state of the given "host:port".
+        :param host: str
+        :return: str
+        """
+        return self._host_state(host).breaker.state
+
+    def _host_state(self, host: str) -> _HostState:
+        """
+        Private helper method to get the state of the given "host:port",
+        creating it on first use.
+        :param host: str
+        :return: _HostState
+        """
+        with self._lock:
+            host_state = self._hosts.get(host)
+            if host_state is None:
+                host_state = _HostState(
+                    self._max_per_host, self._rate_per_host,
+                    self._burst_per_host, self._failure_threshold,
+                    self._reset_timeout
+                )
+                self._hosts[host] = host_state
+            return host_state
+
+
+def _min_wait(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    """
+    Private helper function to get the shorter of the given wait times, where
+    None means no wait time.
+    :param a: float or None
+    :param b: float or None
+    :return: float or None
+    """
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
@@ -0,0 +1,455 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Instrumented drop-in replacements for threading.Lock, threading.RLock,
+threading.Condition, threading.Semaphore and threading.BoundedSemaphore, for
+contention profiling.
+
+Every instrumented lock records
+- its number of acquires, and how many of them had to wait
+- a histogram of the wait times, and a histogram of the hold times
+- the call sites which waited the longest on it
+
+Profiling is enabled either by setting the environment variable LOCK_PROFILE=1,
+or for the locks created within a "with profiling():" block.
+When disabled, the factory functions simply return the plain threading
+primitives, so the cost is zero.
+
+Usage:
+    from instrumented_locks import Lock, profiling, report
+
+    with profiling():
+        lock = Lock(name='balance lock')
+        ...
+    print(report())
+"""
+
+__author__ = 'Ziang Lu'
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import List, Optional
+
+PROFILE_ENV_VAR = 'LOCK_PROFILE'
+
+_enabled = os.environ.get(PROFILE_ENV_VAR) == '1'
+_registry: List['LockStats'] = []
+_registry_lock = threading.Lock()
+
+N_BUCKETS = 32  # Histogram bucket i holds durations in [2^(i-1), 2^i) us
+
+
+class LockStats:
+    """
+    Contention statistics of a single instrumented lock.
+    """
+
+    def __init__(self, name: str, kind: str):
+        """
+        Constructor with parameter.
+        :param name: str
+        :param kind: str
+        """
+        self.name = name
+        self.kind = kind
+        self.n_acquires = 0
+        self.n_contended = 0
+        self.total_wait = 0.0
+        self.total_hold = 0.0
+        self.wait_histogram = [0] * N_BUCKETS
+        self.hold_histogram = [0] * N_BUCKETS
+        self.call_site_waits = Counter()  # {call site: total wait time}
+        # Guards the statistics themselves, not the instrumented lock
+        self._lock = threading.Lock()
+
+    def record_acquire(self, wait: float, call_site: Optional[str]) -> None:
+        """
+        Records an acquire which waited for the given time.
+        :param wait: float
+        :param call_site: str
+        :return: None
+        """
+        with self._lock:
+            self.n_acquires += 1
+            self.wait_histogram[_bucket(wait)] += 1
+            if call_site is not None:
+                self.n_contended += 1
+                self.total_wait += wait
+                self.call_site_waits[call_site] += wait
+
+    def record_release(self, hold: float) -> None:
+        """
+        Records a release after holding for the given time.
+        :param hold: float
+        :return: None
+        """
+        with self._lock:
+            self.total_hold += hold
+            self.hold_histogram[_bucket(hold)] += 1
+
+
+def _bucket(duration: float) -> int:
+    """
+    Private helper function to get the histogram bucket of the given duration.
+    :param duration: float
+    :return: int
+    """
+    return min(int(duration * 1e6).bit_length(), N_BUCKETS - 1)
+
+
+# Frames from these files are skipped when looking for the call site, e.g.,
+# threading.Condition.__enter__() for "with condition:"
+_SKIPPED_FILES = {threading.__file__, __file__}
+
+
+def _call_site() -> str:
+    """
+    Private helper function to describe the innermost call site outside of the
+    threading module and this module.
+    :return: str
+    """
+    frame = sys._getframe(1)
+    while frame.f_back is not None and \
+            frame.f_code.co_filename in _SKIPPED_FILES:
+        frame = frame.f_back
+    code = frame.f_code
+    return (f'{os.path.basename(code.co_filename)}:{frame.f_lineno} '
+            f'({code.co_name})')
+
+
+def _register(name: Optional[str], kind: str) -> LockStats:
+    """
+    Private helper function to create and register the statistics of a new
+    instrumented lock, named after its creation site if no name is given.
+    :param name: str
+    :param kind: str
+    :return: LockStats
+    """
+    if name is None:
+        name = f'{kind} created at {_call_site()}'
+    stats = LockStats(name, kind)
+    with _registry_lock:
+        _registry.append(stats)
+    return stats
+
+
+class _InstrumentedLock:
+    """
+    Wrapper around a lock-like primitive, which records its acquires and
+    releases.
+    """
+    _NON_BLOCKING_TIMEOUT_MSG = "can't specify a timeout for a non-blocking call"
+
+    def __init__(self, inner, stats: LockStats):
+        """
+        Constructor with parameter.
+        :param inner: lock-like object
+        :param stats: LockStats
+        """
+        self._inner = inner
+        self._stats = stats
+        # Acquire times of the current holds, oldest first
+        # They belong to the lock rather than to the acquiring thread, since a
+        # Lock or a Semaphore may be released by another thread, and a Semaphore
+        # or an RLock may be held more than once.
+        self._acquired_at = deque()
+
+    @property
+    def stats(self) -> LockStats:
+        """
+        Accessor of stats.
+        :return: LockStats
+        """
+        return self._stats
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        return self._acquire(blocking, timeout)
+
+    def _acquire(self, blocking: bool, timeout) -> bool:
+        """
+        Private helper method to acquire the inner lock, timing the wait only if
+        the fast, non-blocking attempt fails.
+        :param blocking: bool
+        :param timeout: float
+        :return: bool
+        """
+        if not blocking and timeout is not None and timeout != -1:
+            raise ValueError(self._NON_BLOCKING_TIMEOUT_MSG)
+        if self._inner.acquire(False):
+            self._stats.record_acquire(0.0, None)
+        else:
+            if not blocking:
+                return False
+            call_site = _call_site()
+            start = time.perf_counter()
+            if timeout is None or timeout < 0:
+                acquired = self._inner.acquire()
+            else:
+                acquired = self._inner.acquire(True, timeout)
+            if not acquired:
+                return False
+            self._stats.record_acquire(time.perf_counter() - start, call_site)
+        self._acquired_at.append(time.perf_counter())
+        return True
+
+    def release(self, *args) -> None:
+        self._record_release()
+        self._inner.release(*args)
+
+    def _record_release(self) -> None:
+        """
+        Private helper method to record the release of the oldest hold, which is
+        the only one for a Lock, and a fair guess for a Semaphore (the total
+        hold time is the same either way).
+        :return: None
+        """
+        try:
+            acquired_at = self._acquired_at.popleft()
+        except IndexError:  # Released without being acquired
+            return
+        self._stats.record_release(time.perf_counter() - acquired_at)
+
+    def __enter__(self) -> bool:
+        return self._acquire(True, -1)
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+    def __getattr__(self, name: str):
+        # Delegate the rest, e.g., locked()
+        return getattr(self._inner, name)
+
+    def __repr__(self) -> str:
+        return f'<instrumented {self._stats.name!r} {self._inner!r}>'
+
+
+class _InstrumentedRLock(_InstrumentedLock):
+    """
+    Instrumented RLock, which also supports threading.Condition's internal
+    protocol.
+    """
+
+    def _record_release(self) -> None:
+        """
+        Private helper method to record the release of the innermost hold, since
+        the holds of an RLock are nested.
+        :return: None
+        """
+        try:
+            acquired_at = self._acquired_at.pop()
+        except IndexError:  # Released without being acquired
+            return
+        self._stats.record_release(time.perf_counter() - acquired_at)
+
+    def _is_owned(self) -> bool:
+        return self._inner._is_owned()
+
+    def _release_save(self):
+        # Only the owner thread holds an RLock, so all the holds are released
+        acquire_times = list(self._acquired_at)
+        self._acquired_at.clear()
+        if acquire_times:
+            self._stats.record_release(time.perf_counter() - acquire_times[0])
+        return self._inner._release_save(), len(acquire_times)
+
+    def _acquire_restore(self, state) -> None:
+        inner_state, n_acquires = state
+        start = time.perf_counter()
+        self._inner._acquire_restore(inner_state)
+        now = time.perf_counter()
+        wait = now - start
+        # Re-acquiring after Condition.wait() returns counts as an acquire
+        self._stats.record_acquire(
+            wait, _call_site() if wait > 1e-5 else None
+        )
+        self._acquired_at.extend([now] * n_acquires)
+
+
+class _InstrumentedSemaphore(_InstrumentedLock):
+    """
+    Instrumented Semaphore or BoundedSemaphore.
+    """
+    _NON_BLOCKING_TIMEOUT_MSG = "can't specify timeout for non-blocking acquire"
+
+    def acquire(self, blocking: bool = True,
+                timeout: Optional[float] = None) -> bool:
+        return self._acquire(blocking, timeout)
+
+    def release(self, n: int = 1) -> None:
+        for _ in range(n):
+            super().release()
+
+
+##### Factory functions #####
+
+
+def Lock(name: Optional[str] = None):
+    """
+    Drop-in replacement for threading.Lock().
+    :param name: str
+    :return: Lock
+    """
+    if not _enabled:
+        return threading.Lock()
+    return _InstrumentedLock(threading.Lock(), _register(name, 'Lock'))
+
+
+def RLock(name: Optional[str] = None):
+    """
+    Drop-in replacement for threading.RLock().
+    :param name: str
+    :return: RLock
+    """
+    if not _enabled:
+        return threading.RLock()
+    return _InstrumentedRLock(threading.RLock(), _register(name, 'RLock'))
+
+
+def Condition(lock=None, name: Optional[str] = None):
+    """
+    Drop-in replacement for threading.Condition(), whose lock is instrumented.
+    A given lock is used as is, so name can only be given without a lock (the
+    lock should then be named when it is created).
+    :param lock: lock-like object
+    :param name: str
+    :return: Condition
+    """
+    if lock is not None and name is not None:
+        raise ValueError(
+            'name cannot be given together with lock; name the lock instead'
+        )
+    if not _enabled:
+        return threading.Condition(lock)
+    if lock is None:
+        lock = _InstrumentedRLock(
+            threading.RLock(), _register(name, 'Condition')
+        )
+    return threading.Condition(lock)
+
+
+def Semaphore(value: int = 1, name: Optional[str] = None):
+    """
+    Drop-in replacement for threading.Semaphore().
+    :param value: int
+    :param name: str
+    :return: Semaphore
+    """
+    if not _enabled:
+        return threading.Semaphore(value)
+    return _InstrumentedSemaphore(
+        threading.Semaphore(value), _register(name, 'Semaphore')
+    )
+
+
+def BoundedSemaphore(value: int = 1, name: Optional[str] = None):
+    """
+    Drop-in replacement for threading.BoundedSemaphore().
+    :param value: int
+    :param name: str
+    :return: BoundedSemaphore
+    """
+    if not _enabled:
+        return threading.BoundedSemaphore(value)
+    return _InstrumentedSemaphore(
+        threading.BoundedSemaphore(value), _register(name, 'BoundedSemaphore')
+    )
+
+
+##### Enabling & reporting #####
+
+
+def is_enabled() -> bool:
+    """
+    Returns whether the locks created now are instrumented.
+    :return: bool
+    """
+    return _enabled
+
+
+@contextmanager
+def profiling():
+    """
+    Context manager which instruments the locks created within it.
+    Note that the locks keep recording after the block exits.
+    :return: None
+    """
+    global _enabled
+    was_enabled = _enabled
+    _enabled = True
+    try:
+        yield
+    finally:
+        _enabled = was_enabled
+
+
+def reset() -> None:
+    """
+    Forgets the statistics of all the instrumented locks created so far.
+    :return: None
+    """
+    with _registry_lock:
+        _registry.clear()
+
+
+def hottest_locks(top: int = 5) -> List[LockStats]:
+    """
+    Returns the statistics of the locks with the longest total wait time.
+    :param top: int
+    :return: list[LockStats]
+    """
+    with _registry_lock:
+        registry = list(_registry)
+    return sorted(
+        registry, key=lambda stats: (stats.total_wait, stats.n_acquires),
+        reverse=True
+    )[:top]
+
+
+def _percentile(histogram: List[int], fraction: float) -> str:
+    """
+    Private helper function to describe the upper bound of the histogram bucket
+    where the given fraction of the samples falls.
+    :param histogram: list[int]
+    :param fraction: float
+    :return: str
+    """
+    total = sum(histogram)
+    if not total:
+        return '-'
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= fraction * total:
+            return f'<{2 ** i}us'
+    return f'>={2 ** (N_BUCKETS - 1)}us'
+
+
+def report(top: int = 5, n_call_sites: int = 3) -> str:
+    """
+    Returns a report naming the hottest locks so far.
+    :param top: int
+    :param n_call_sites: int
+    :return: str
+    """
+    lines = ['Hottest locks (by total wait time):']
+    for stats in hottest_locks(top):
+        contended_pct = 100 * stats.n_contended / max(stats.n_acquires, 1)
+        lines.append(
+            f'  {stats.name}: {stats.n_acquires} acquires, '
+            f'{stats.n_contended} contended ({contended_pct:.1f}%), '
+            f'waited {stats.total_wait:.3f} s, held {stats.total_hold:.3f} s'
+        )
+        lines.append(
+            f'    wait p50 {_percentile(stats.wait_histogram, 0.5)}, '
+            f'p99 {_percentile(stats.wait_histogram, 0.99)}; '
+            f'hold p50 {_percentile(stats.hold_histogram, 0.5)}, '
+            f'p99 {_percentile(stats.hold_histogram, 0.99)}'
+        )
+        for call_site, wait in stats.call_site_waits.most_common(n_call_sites):
+            lines.append(f'    {wait:8.3f} s waited at {call_site}')
+    return '\n'.join(lines)
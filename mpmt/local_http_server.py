@@ -0,0 +1,179 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Local HTTP stand-in server with injected latency.
+
+Used to benchmark the site fetchers against something reproducible, instead of
+hitting the real Internet.
+"""
+
+__author__ = 'Ziang Lu'
+
+import hashlib
+import sys
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Optional
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """
+    Request handler that sleeps for the server's latency, and then serves the
+    server's body.
+    """
+    # HTTP/1.1 so that the clients are able to keep the connections alive
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, so without TCP_NODELAY, a
+    # kept-alive connection stalls on Nagle's algorithm + delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self._respond(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._respond(send_body=False)
+
+    def _respond(self, send_body: bool) -> None:
+        """
+        Private helper method to send the response.
+        :param send_body: bool
+        :return: None
+        """
+        time.sleep(self.server.latency)  # Injected latency
+        server = self.server
+        if server.validators:
+            if self.headers.get('If-None-Match') == server.etag:
+                # The client's cached copy is still valid
+                self.send_response(304)
+                self._send_cache_headers()
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+        body = server.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self._send_cache_headers()
+        if self.server.send_content_length:
+            self.send_header('Content-Length', str(len(body)))
+        else:
+            # Without a Content-Length, the end of the body can only be told by
+            # closing the connection
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+            server.count_body_bytes(len(body))
+
+    def _send_cache_headers(self) -> None:
+        """
+        Private helper method to send the validators and Cache-Control headers,
+        if configured.
+        :return: None
+        """
+        server = self.server
+        if server.validators:
+            self.send_header('ETag', server.etag)
+            self.send_header('Last-Modified', server.last_modified)
+        if server.max_age is not None:
+            self.send_header('Cache-Control', f'max-age={server.max_age}')
+
+    def log_message(self, format: str, *args) -> None:
+        # Keep the benchmark output clean
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Threading HTTP server on a random local port, which counts the number of TCP
+    connections it accepted, so that we can tell whether the clients reuse their
+    connections.
+    """
+    daemon_threads = True
+    request_queue_size = 1024  # Allow thousands of concurrent connects
+
+    def __init__(self, latency: float = 0.02, body_size: int = 10000,
+                 send_content_length: bool = True, validators: bool = False,
+                 max_age: Optional[int] = None):
+        """
+        Constructor with parameter.
+        :param latency: float
+        :param body_size: int
+        :param send_content_length: bool
+        :param validators: bool
+        :param max_age: int
+        """
+        super().__init__(('127.0.0.1', 0), _StandInHandler)
+        self.latency = latency
+        self.body = b'x' * body_size
+        self.send_content_length = send_content_length
+        # Validators (ETag & Last-Modified) for conditional requests
+        self.validators = validators
+        self.etag = f'"{hashlib.md5(self.body).hexdigest()}"'
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.max_age = max_age
+        self._connection_count = 0
+        self._body_bytes_sent = 0
+        self._count_lock = Lock()
+
+    @property
+    def base_url(self) -> str:
+        """
+        Accessor of base_url.
+        :return: str
+        """
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def connection_count(self) -> int:
+        """
+        Accessor of connection_count.
+        :return: int
+        """
+        return self._connection_count
+
+    @property
+    def body_bytes_sent(self) -> int:
+        """
+        Accessor of body_bytes_sent.
+        :return: int
+        """
+        return self._body_bytes_sent
+
+    def count_body_bytes(self, n: int) -> None:
+        """
+        Counts the given number of body bytes as sent.
+        :param n: int
+        :return: None
+        """
+        with self._count_lock:
+            self._body_bytes_sent += n
+
+    def process_request(self, request, client_address) -> None:
+        with self._count_lock:
+            self._connection_count += 1
+        super().process_request(request, client_address)
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients that time out and hang up are expected in the benchmarks
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self) -> 'StandInServer':
+        """
+        Starts serving in a daemon thread.
+        :return: StandInServer
+        """
+        Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,78 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Helpers to assign asynchronous tasks into a process (or thread) pool.
+"""
+
+__author__ = 'Ziang Lu'
+
+import concurrent.futures as cf
+import os
+import random
+import time
+from typing import Callable, Iterable, NamedTuple
+
+
+class PoolRun(NamedTuple):
+    """
+    Results of a pool run (in completion order), together with its actual
+    running time.
+    """
+    results: list
+    wall_time: float
+
+
+def long_time_task(name: str) -> float:
+    """
+    Dummy long task to be run within a process.
+    :param name: str
+    :return: float
+    """
+    print(f"Running task '{name}' ({os.getpid()})...")
+    start = time.time()
+    time.sleep(random.random() * 3)
+    end = time.time()
+    time_elapsed = end - start
+    print(f"Task '{name}' runs {time_elapsed:.2f} seconds.")
+    return time_elapsed
+
+
+def run_in_pool(func: Callable, args: Iterable, max_workers: int = 4,
+                use_threads: bool = False) -> PoolRun:
+    """
+    Runs func on each of the given arguments in a pool of the given size, and
+    returns the results in completion order.
+    :param func: callable
+    :param args: iterable
+    :param max_workers: int
+    :param use_threads: bool
+    :return: PoolRun
+    """
+    executor_class = (
+        cf.ThreadPoolExecutor if use_threads else cf.ProcessPoolExecutor
+    )
+    with executor_class(max_workers=max_workers) as pool:
+        start = time.time()
+        # Will NOT block here
+        futures = [pool.submit(func, arg) for arg in args]
+        results = [future.result() for future in cf.as_completed(futures)]
+        end = time.time()
+    return PoolRun(results, end - start)
+
+
+def run_long_time_tasks(n_tasks: int = 5, max_workers: int = 4,
+                        use_threads: bool = False) -> PoolRun:
+    """
+    Runs the given number of long_time_task() in a pool of the given size.
+    The sum of the results is the theoretical running time of the tasks, to
+    compare with the actual running time.
+    :param n_tasks: int
+    :param max_workers: int
+    :param use_threads: bool
+    :return: PoolRun
+    """
+    return run_in_pool(
+        long_time_task, [f'Task-{i}' for i in range(n_tasks)], max_workers,
+        use_threads
+    )
@@ -0,0 +1,154 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Manager threads which own a shared resource, and which the rest of the program
+talks to only through an atomic message queue.
+
+1. Each shared resource shall be accessed in exactly its own thread.
+2. All communications with that thread shall be done using an atomic message
+   queue.
+
+Both managers drain all the pending messages in one pass (see batch_queue.py).
+Nothing is started at import time: the daemon threads are started by start().
+"""
+
+__author__ = 'Ziang Lu'
+
+import sys
+from threading import Thread
+from typing import List, Optional, TextIO
+
+from mpmt.batch_queue import BatchQueue
+
+
+class PrintManager:
+    """
+    Owns an output stream (sys.stdout by default), and prints the lists of lines
+    put into its queue.
+    """
+
+    def __init__(self, out: Optional[TextIO] = None):
+        """
+        Constructor with parameter.
+        :param out: file
+        """
+        self._out = out
+        self.queue = BatchQueue()
+        self._thread = None
+
+    def start(self) -> 'PrintManager':
+        """
+        Starts the print()-access daemon thread.
+        :return: PrintManager
+        """
+        self._thread = Thread(
+            target=self._run, name='print()-access Daemon Thread', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def print(self, *lines: str) -> None:
+        """
+        Sends the given lines to be printed together.
+        :param lines: str
+        :return: None
+        """
+        self.queue.put(list(lines))
+
+    def join(self) -> None:
+        """
+        Blocks until everything sent so far has been printed.
+        :return: None
+        """
+        self.queue.join()
+
+    def _run(self) -> None:
+        """
+        Private helper method, as the daemon thread function.
+        :return: None
+        """
+        # Resolve sys.stdout lazily, so that redirecting it after construction
+        # still works
+        out = self._out if self._out is not None else sys.stdout
+        while True:
+            batch = self.queue.get_many()
+            lines: List[str] = []
+            for stuff_to_print in batch:
+                lines.extend(stuff_to_print)
+            # Emit the whole batch as one buffered write
+            out.write('\n'.join(lines) + '\n')
+            out.flush()
+            self.queue.task_done_many(len(batch))
+
+
+class CounterManager:
+    """
+    Owns a counter, and applies the increments put into its queue, reporting
+    every new value to the given print manager (if any).
+    """
+
+    def __init__(self, print_manager: Optional[PrintManager] = None,
+                 initial: int = 0):
+        """
+        Constructor with parameter.
+        :param print_manager: PrintManager
+        :param initial: int
+        """
+        self._print_manager = print_manager
+        self._value = initial
+        self.queue = BatchQueue()
+        self._thread = None
+
+    @property
+    def value(self) -> int:
+        """
+        Accessor of value.
+        Only consistent after join().
+        :return: int
+        """
+        return self._value
+
+    def start(self) -> 'CounterManager':
+        """
+        Starts the "counter"-access daemon thread.
+        :return: CounterManager
+        """
+        self._thread = Thread(
+            target=self._run, name='Counter-access Daemon Thread', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def increment(self, n: int = 1) -> None:
+        """
+        Sends an increment of n.
+        :param n: int
+        :return: None
+        """
+        self.queue.put(n)
+
+    def join(self) -> None:
+        """
+        Blocks until every increment sent so far has been applied.
+        :return: None
+        """
+        self.queue.join()
+
+    def _run(self) -> None:
+        """
+        Private helper method, as the daemon thread function.
+        :return: None
+        """
+        while True:
+            # Drain all the pending increments, and apply them as a single
+            # aggregate update
+            increments = self.queue.get_many()
+            self._value += sum(increments)
+            if self._print_manager is not None:
+                self._print_manager.print(
+                    f'Counter value: {self._value}', '----------'
+                )
+            # Marked as done only after reporting, so that join() on this
+            # manager followed by join() on the print manager sees every line
+            self.queue.task_done_many(len(increments))
@@ -0,0 +1,1076 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Deterministic schedule exploration for the threaded examples.
+
+Sleep-based fuzzing (sleeping a random time before every shared-state
+operation) only finds races by chance, and a single run takes seconds.
+Instead, under explore(), the fuzz() call sites become cooperative yield
+points: every managed thread only runs while it holds the scheduler's baton, so
+exactly one thread runs at a time, and at every yield point the scheduler
+decides which thread runs next.
+- RANDOM picks the next thread with a per-schedule seeded RNG, so that a
+  failing schedule is replayed exactly from its seed
+- SYSTEMATIC enumerates the interleavings depth-first, which is exhaustive for
+  a small number of threads
+Either way, a failing schedule is also reported as its list of choices, which
+replay() runs again.
+Every thread switch is a real handoff between OS threads (a few microseconds),
+so a single process explores thousands of schedules per second; since random
+schedules are independent of each other, RANDOM also splits its seeds across
+forked processes, to scale with the number of cores.
+
+The code under test must use the scheduler-aware Thread, Lock, RLock, Condition
+and Queue below instead of the threading/queue ones (e.g., patched in with
+unittest.mock.patch.multiple()), since a thread blocking for real on a lock
+held by a parked thread would hang the exploration.
+The scheduler only switches threads at yield_point(), Thread.start() and
+wherever a thread blocks, which keeps the number of schedules tractable.
+There is no clock under the scheduler: timeouts never fire.
+"""
+
+__author__ = 'Ziang Lu'
+
+import io
+import multiprocessing as mp
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+RANDOM = 'random'
+SYSTEMATIC = 'systematic'
+
+# The scheduler of the running exploration, if any
+_scheduler: Optional['_Scheduler'] = None
+# Arguments of the parallel exploration, inherited by the forked processes
+_parallel_job: Optional[tuple] = None
+
+
+class _Abort(BaseException):
+    """
+    Raised in the parked threads, to unwind them at the end of a schedule.
+    Derived from BaseException, so that "except Exception" in the code under
+    test does not swallow it.
+    """
+    pass
+
+
+class Failure(NamedTuple):
+    """
+    A failing schedule.
+    """
+    schedule: int  # Index of the schedule within the exploration
+    seed: Optional[int]  # Seed which replays it (RANDOM strategy only)
+    choices: List[int]  # Choice made at every decision, for replay()
+    trace: List[str]  # Name of the thread picked at every decision
+    message: str
+    output: str  # Everything the schedule printed
+
+
+class ExplorationResult(NamedTuple):
+    """
+    Result of an exploration.
+    """
+    n_schedules: int
+    elapsed: float
+    exhausted: bool  # Whether SYSTEMATIC ran out of schedules to explore
+    failures: List[Failure]
+
+    @property
+    def schedules_per_sec(self) -> float:
+        """
+        Accessor of schedules_per_sec.
+        :return: float
+        """
+        return self.n_schedules / self.elapsed if self.elapsed else 0.0
+
+
+##### Strategies #####
+
+
+class _RandomStrategy:
+    """
+    Picks uniformly at random, with the seed "seed + schedule index", so that
+    every schedule can be replayed on its own.
+    """
+
+    def __init__(self, seed: int):
+        """
+        Constructor with parameter.
+        :param seed: int
+        """
+        self._seed = seed
+        self._rng = random.Random()
+        self.schedule_seed = None
+
+    def next_schedule(self, index: int) -> bool:
+        """
+        Prepares the given schedule.
+        :param index: int
+        :return: bool whether there is such a schedule
+        """
+        self.schedule_seed = self._seed + index
+        self._rng.seed(self.schedule_seed)
+        return True
+
+    def choose(self, n_options: int) -> int:
+        """
+        Picks one of the given number of runnable threads.
+        :param n_options: int
+        :return: int
+        """
+        return int(self._rng.random() * n_options)
+
+
+class _SystematicStrategy:
+    """
+    Stateless depth-first search over the decisions: every schedule replays the
+    prefix of the previous one up to its deepest decision with an untried
+    option, and takes the next option there.
+    """
+    schedule_seed = None
+
+    def __init__(self):
+        """
+        Default constructor.
+        """
+        self._stack = []  # [choice, n_options] of every decision so far
+        self._depth = 0
+
+    def next_schedule(self, index: int) -> bool:
+        """
+        Prepares the given schedule.
+        :param index: int
+        :return: bool whether there is such a schedule
+        """
+        if index:
+            del self._stack[self._depth:]
+            while self._stack and self._stack[-1][0] + 1 >= self._stack[-1][1]:
+                self._stack.pop()
+            if not self._stack:
+                return False
+            self._stack[-1][0] += 1
+        self._depth = 0
+        return True
+
+    def choose(self, n_options: int) -> int:
+        """
+        Picks one of the given number of runnable threads.
+        :param n_options: int
+        :return: int
+        """
+        if self._depth < len(self._stack):
+            decision = self._stack[self._depth]
+            # The code under test must be deterministic under the scheduler,
+            # but stay within range if it is not
+            decision[1] = n_options
+            decision[0] = min(decision[0], n_options - 1)
+        else:
+            decision = [0, n_options]
+            self._stack.append(decision)
+        self._depth += 1
+        return decision[0]
+
+
+class _ReplayStrategy:
+    """
+    Replays the given choices, and picks the first runnable thread afterwards.
+    """
+    schedule_seed = None
+
+    def __init__(self, choices: List[int]):
+        """
+        Constructor with parameter.
+        :param choices: list[int]
+        """
+        self._choices = choices
+        self._depth = 0
+
+    def next_schedule(self, index: int) -> bool:
+        """
+        Prepares the given schedule.
+        :param index: int
+        :return: bool whether there is such a schedule
+        """
+        self._depth = 0
+        return index == 0
+
+    def choose(self, n_options: int) -> int:
+        """
+        Picks one of the given number of runnable threads.
+        :param n_options: int
+        :return: int
+        """
+        choice = 0
+        if self._depth < len(self._choices):
+            choice = min(self._choices[self._depth], n_options - 1)
+        self._depth += 1
+        return choice
+
+
+##### Scheduler #####
+
+
+class _Task:
+    """
+    A managed thread within a schedule.
+    """
+    __slots__ = [
+        'name', 'target', 'daemon', 'worker', 'started', 'done', 'wait_for'
+    ]
+
+    def __init__(self, name: str, target: Callable, daemon: bool,
+                 worker: '_Worker'):
+        """
+        Constructor with parameter.
+        :param name: str
+        :param target: callable
+        :param daemon: bool
+        :param worker: _Worker
+        """
+        self.name = name
+        self.target = target
+        self.daemon = daemon
+        self.worker = worker
+        self.started = False
+        self.done = False
+        # Predicate the task is blocked on, or None if it is runnable
+        self.wait_for: Optional[Callable[[], bool]] = None
+
+
+class _Worker:
+    """
+    A real thread, which runs one task per schedule, and is reused across
+    schedules, so that no schedule pays for starting threads.
+    """
+    __slots__ = ['baton', 'task', 'thread']
+
+    def __init__(self, scheduler: '_Scheduler'):
+        """
+        Constructor with parameter.
+        :param scheduler: _Scheduler
+        """
+        # The worker runs only while its baton is released for it
+        self.baton = threading.Lock()
+        self.baton.acquire()
+        self.task: Optional[_Task] = None
+        self.thread = threading.Thread(
+            target=scheduler.work, args=(self,), daemon=True,
+            name='Schedule-explorer Worker'
+        )
+        self.thread.start()
+
+
+class _Scheduler:
+    """
+    Runs one schedule at a time, handing the baton from task to task.
+    All the scheduler state is only touched by the task holding the baton, or
+    by the controller (the thread calling explore()) while every task is
+    parked.
+    """
+
+    def __init__(self, max_steps: int):
+        """
+        Constructor with parameter.
+        :param max_steps: int
+        """
+        self._max_steps = max_steps
+        self._idle_workers: List[_Worker] = []
+        self._all_workers: List[_Worker] = []
+        self._controller = threading.Lock()
+        self._controller.acquire()
+        self._strategy = None
+        self._tasks: List[_Task] = []
+        self._n_live = 0  # Number of non-daemon tasks not done yet
+        self._steps = 0
+        self._aborting = False
+        self.n_threads = 0  # Number of Threads created, for their names
+        self.current: Optional[_Task] = None
+        self.choices: List[int] = []
+        self.trace: List[str] = []
+        self.errors: List[str] = []
+
+    def run(self, main: Callable, strategy) -> None:
+        """
+        Runs one schedule of the given main function, as "MainThread".
+        :param main: callable
+        :param strategy: strategy
+        :return: None
+        """
+        self._strategy = strategy
+        self._tasks = []
+        self._n_live = 0
+        self._steps = 0
+        self._aborting = False
+        self.n_threads = 0
+        self.choices = []
+        self.trace = []
+        self.errors = []
+        root = self.spawn(main, 'MainThread', daemon=False)
+        self.current = root
+        root.worker.baton.release()
+        self._controller.acquire()  # Until the schedule is over
+        self._abort_all()
+
+    def spawn(self, target: Callable, name: str, daemon: bool) -> _Task:
+        """
+        Creates a runnable task.
+        :param target: callable
+        :param name: str
+        :param daemon: bool
+        :return: _Task
+        """
+        if self._idle_workers:
+            worker = self._idle_workers.pop()
+        else:
+            worker = _Worker(self)
+            self._all_workers.append(worker)
+        task = _Task(name, target, daemon, worker)
+        worker.task = task
+        self._tasks.append(task)
+        if not daemon:
+            self._n_live += 1
+        return task
+
+    def work(self, worker: _Worker) -> None:
+        """
+        Worker thread function.
+        :param worker: _Worker
+        :return: None
+        """
+        while True:
+            worker.baton.acquire()
+            task = worker.task
+            if task is None:  # Shut down
+                return
+            task.started = True
+            try:
+                task.target()
+            except _Abort:
+                pass
+            except BaseException as e:
+                if not self._aborting:
+                    self.errors.append(f'Exception in {task.name}: {e!r}')
+            self._finish(task)
+
+    def yield_point(self) -> None:
+        """
+        Lets the strategy pick the next task to run, possibly the current one.
+        :return: None
+        """
+        if self._aborting:
+            return
+        current = self.current
+        nxt = self._pick()
+        if nxt is None:
+            self._park_until_aborted(current)
+        elif nxt is not current:
+            self._switch(current, nxt)
+
+    def wait_until(self, predicate: Callable[[], bool]) -> None:
+        """
+        Blocks the current task until the given predicate holds.
+        :param predicate: callable
+        :return: None
+        """
+        if predicate():
+            return
+        if self._aborting:
+            raise _Abort
+        current = self.current
+        current.wait_for = predicate
+        nxt = self._pick()
+        if nxt is None:
+            self._park_until_aborted(current)
+        self._switch(current, nxt)
+        # Nothing else ran between the pick and now, so the predicate holds
+        current.wait_for = None
+
+    def _pick(self) -> Optional[_Task]:
+        """
+        Private helper method to pick the next task to run.
+        Returns None if the schedule is over.
+        :return: _Task or None
+        """
+        if not self._n_live:
+            return None
+        self._steps += 1
+        if self._steps > self._max_steps:
+            self.errors.append(f'Step limit of {self._max_steps} exceeded')
+            return None
+        runnable = [
+            task for task in self._tasks
+            if not task.done and (task.wait_for is None or task.wait_for())
+        ]
+        if not runnable:
+            blocked = ', '.join(task.name for task in self._tasks
+                                if not task.done)
+            self.errors.append(f'Deadlock: {blocked} blocked')
+            return None
+        if len(runnable) == 1:
+            return runnable[0]
+        choice = self._strategy.choose(len(runnable))
+        self.choices.append(choice)
+        nxt = runnable[choice]
+        self.trace.append(nxt.name)
+        return nxt
+
+    def _switch(self, current: _Task, nxt: _Task) -> None:
+        """
+        Private helper method to hand the baton from the current task to the
+        given one, and park the current task until it gets the baton back.
+        :param current: _Task
+        :param nxt: _Task
+        :return: None
+        """
+        self.current = nxt
+        nxt.worker.baton.release()
+        current.worker.baton.acquire()
+        if self._aborting:
+            raise _Abort
+
+    def _park_until_aborted(self, current: _Task) -> None:
+        """
+        Private helper method to end the schedule, and park the current task
+        until the controller aborts it.
+        :param current: _Task
+        :return: None
+        """
+        self._controller.release()
+        current.worker.baton.acquire()
+        raise _Abort
+
+    def _finish(self, task: _Task) -> None:
+        """
+        Private helper method to mark the given task as done, and hand the
+        baton on.
+        :param task: _Task
+        :return: None
+        """
+        task.done = True
+        if not task.daemon:
+            self._n_live -= 1
+        if self._aborting:
+            self._controller.release()
+            return
+        nxt = self._pick()
+        if nxt is None:
+            self._controller.release()
+        else:
+            self.current = nxt
+            nxt.worker.baton.release()
+
+    def _abort_all(self) -> None:
+        """
+        Private helper method to unwind the tasks still parked at the end of a
+        schedule (e.g., daemon threads, or deadlocked ones), one at a time, and
+        return all the workers to the idle pool.
+        :return: None
+        """
+        self._aborting = True
+        for task in self._tasks:
+            if task.started and not task.done:
+                self.current = task
+                task.worker.baton.release()
+                self._controller.acquire()
+        self._idle_workers.extend(task.worker for task in self._tasks)
+
+    def shutdown(self) -> None:
+        """
+        Stops all the worker threads.
+        :return: None
+        """
+        for worker in self._all_workers:
+            worker.task = None
+            worker.baton.release()
+        for worker in self._all_workers:
+            worker.thread.join()
+
+
+def _active() -> _Scheduler:
+    """
+    Private helper function to get the scheduler of the running exploration.
+    :return: _Scheduler
+    """
+    if _scheduler is None:
+        raise RuntimeError(
+            'Scheduler-aware primitives can only be used within explore()'
+        )
+    return _scheduler
+
+
+def yield_point() -> None:
+    """
+    Cooperative yield point, to call (or patch in) at every fuzz() call site.
+    A no-op outside explore().
+    :return: None
+    """
+    scheduler = _scheduler
+    if (scheduler is not None and scheduler.current is not None and
+            scheduler.current.worker.thread.ident == threading.get_ident()):
+        scheduler.yield_point()
+
+
+##### Scheduler-aware primitives #####
+
+
+class Thread:
+    """
+    Drop-in replacement for threading.Thread under the scheduler.
+    """
+
+    def __init__(self, group=None, target: Optional[Callable] = None,
+                 name: Optional[str] = None, args: tuple = (),
+                 kwargs: Optional[dict] = None, *,
+                 daemon: Optional[bool] = None):
+        """
+        Constructor with parameter.
+        :param group: None
+        :param target: callable
+        :param name: str
+        :param args: tuple
+        :param kwargs: dict
+        :param daemon: bool
+        """
+        scheduler = _active()
+        self._target = target
+        self._args = args
+        self._kwargs = kwargs or {}
+        scheduler.n_threads += 1
+        self.name = name or f'Thread-{scheduler.n_threads}'
+        # As in threading, a thread inherits the daemon flag of its creator
+        self.daemon = scheduler.current.daemon if daemon is None else daemon
+        self._task: Optional[_Task] = None
+
+    def run(self) -> None:
+        """
+        The thread's activity.
+        :return: None
+        """
+        if self._target is not None:
+            self._target(*self._args, **self._kwargs)
+
+    def start(self) -> None:
+        """
+        Makes the thread runnable, and lets the strategy decide whether it runs
+        right away.
+        :return: None
+        """
+        if self._task is not None:
+            raise RuntimeError('threads can only be started once')
+        self._task = _active().spawn(self.run, self.name, self.daemon)
+        yield_point()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        Blocks until the thread is done.
+        :param timeout: float (never fires)
+        :return: None
+        """
+        if self._task is None:
+            raise RuntimeError('cannot join thread before it is started')
+        task = self._task
+        _active().wait_until(lambda: task.done)
+
+    def is_alive(self) -> bool:
+        """
+        Returns whether the thread is started and not done yet.
+        :return: bool
+        """
+        return self._task is not None and not self._task.done
+
+
+class Lock:
+    """
+    Drop-in replacement for threading.Lock under the scheduler.
+    """
+
+    def __init__(self):
+        """
+        Default constructor.
+        """
+        self._owner: Optional[_Task] = None
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        """
+        Acquires the lock.
+        :param blocking: bool
+        :param timeout: float (never fires)
+        :return: bool
+        """
+        scheduler = _active()
+        if self._owner is not None:
+            if not blocking:
+                return False
+            scheduler.wait_until(self._is_free)
+        self._owner = scheduler.current
+        return True
+
+    def release(self) -> None:
+        """
+        Releases the lock.
+        :return: None
+        """
+        if self._owner is None:
+            raise RuntimeError('release unlocked lock')
+        self._owner = None
+
+    def locked(self) -> bool:
+        """
+        Returns whether the lock is held.
+        :return: bool
+        """
+        return self._owner is not None
+
+    def _is_free(self) -> bool:
+        return self._owner is None
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.release()
+
+    # Condition protocol
+
+    def _is_owned(self) -> bool:
+        return self._owner is _active().current
+
+    def _release_save(self) -> None:
+        self.release()
+
+    def _acquire_restore(self, state) -> None:
+        self.acquire()
+
+
+class RLock(Lock):
+    """
+    Drop-in replacement for threading.RLock under the scheduler.
+    """
+
+    def __init__(self):
+        """
+        Default constructor.
+        """
+        super().__init__()
+        self._count = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        """
+        Acquires the lock, re-entrantly.
+        :param blocking: bool
+        :param timeout: float (never fires)
+        :return: bool
+        """
+        if self._owner is not None and self._owner is _active().current:
+            self._count += 1
+            return True
+        acquired = super().acquire(blocking, timeout)
+        if acquired:
+            self._count = 1
+        return acquired
+
+    def release(self) -> None:
+        """
+        Releases the lock once.
+        :return: None
+        """
+        if self._owner is None or self._owner is not _active().current:
+            raise RuntimeError('cannot release un-acquired lock')
+        self._count -= 1
+        if not self._count:
+            self._owner = None
+
+    # Condition protocol
+
+    def _release_save(self) -> tuple:
+        state = (self._count, self._owner)
+        self._count = 0
+        self._owner = None
+        return state
+
+    def _acquire_restore(self, state: tuple) -> None:
+        _active().wait_until(self._is_free)
+        self._count, self._owner = state
+
+
+class Condition:
+    """
+    Drop-in replacement for threading.Condition under the scheduler.
+    """
+
+    def __init__(self, lock: Optional[Lock] = None):
+        """
+        Constructor with parameter.
+        :param lock: Lock or RLock
+        """
+        self._lock = lock if lock is not None else RLock()
+        self.acquire = self._lock.acquire
+        self.release = self._lock.release
+        self._waiters = deque()
+
+    def __enter__(self) -> bool:
+        return self._lock.__enter__()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        return self._lock.__exit__(exc_type, exc_val, exc_tb)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Releases the lock, blocks until notified, and re-acquires the lock.
+        :param timeout: float (never fires)
+        :return: bool
+        """
+        if not self._lock._is_owned():
+            raise RuntimeError('cannot wait on un-acquired lock')
+        waiter = [False]  # Whether notified
+        self._waiters.append(waiter)
+        saved_state = self._lock._release_save()
+        try:
+            _active().wait_until(lambda: waiter[0])
+        finally:
+            self._lock._acquire_restore(saved_state)
+        return True
+
+    def wait_for(self, predicate: Callable[[], bool],
+                 timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the given predicate holds.
+        :param predicate: callable
+        :param timeout: float (never fires)
+        :return: bool
+        """
+        result = predicate()
+        while not result:
+            self.wait(timeout)
+            result = predicate()
+        return result
+
+    def notify(self, n: int = 1) -> None:
+        """
+        Wakes up at most n waiting threads.
+        :param n: int
+        :return: None
+        """
+        if not self._lock._is_owned():
+            raise RuntimeError('cannot notify on un-acquired lock')
+        while self._waiters and n > 0:
+            self._waiters.popleft()[0] = True
+            n -= 1
+
+    def notify_all(self) -> None:
+        """
+        Wakes up all the waiting threads.
+        :return: None
+        """
+        self.notify(len(self._waiters))
+
+
+class Queue:
+    """
+    Drop-in replacement for queue.Queue (and BatchQueue) under the scheduler.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        """
+        Constructor with parameter.
+        :param maxsize: int
+        """
+        self.maxsize = maxsize
+        self._items = deque()
+        self.unfinished_tasks = 0
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= len(self._items)
+
+    def put(self, item, block: bool = True,
+            timeout: Optional[float] = None) -> None:
+        """
+        Puts the given item into the queue, blocking while it is full.
+        :param item: object
+        :param block: bool
+        :param timeout: float (never fires)
+        :return: None
+        """
+        if self.full():
+            if not block:
+                raise queue.Full
+            _active().wait_until(lambda: not self.full())
+        self._items.append(item)
+        self.unfinished_tasks += 1
+
+    def put_nowait(self, item) -> None:
+        self.put(item, block=False)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        """
+        Removes and returns an item, blocking while the queue is empty.
+        :param block: bool
+        :param timeout: float (never fires)
+        :return: object
+        """
+        self._wait_for_items(block)
+        return self._items.popleft()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_many(self, max_items: Optional[int] = None, block: bool = True,
+                 timeout: Optional[float] = None) -> list:
+        """
+        Removes and returns all the pending items (at most max_items), blocking
+        while the queue is empty.
+        :param max_items: int
+        :param block: bool
+        :param timeout: float (never fires)
+        :return: list
+        """
+        self._wait_for_items(block)
+        n = len(self._items)
+        if max_items is not None:
+            n = min(n, max_items)
+        return [self._items.popleft() for _ in range(n)]
+
+    def _wait_for_items(self, block: bool) -> None:
+        """
+        Private helper method to block while the queue is empty.
+        :param block: bool
+        :return: None
+        """
+        if not self._items:
+            if not block:
+                raise queue.Empty
+            _active().wait_until(lambda: bool(self._items))
+
+    def task_done(self) -> None:
+        """
+        Marks a task as done.
+        :return: None
+        """
+        self.task_done_many(1)
+
+    def task_done_many(self, n: int) -> None:
+        """
+        Marks n tasks as done.
+        :param n: int
+        :return: None
+        """
+        if n > self.unfinished_tasks:
+            raise ValueError('task_done() called too many times')
+        self.unfinished_tasks -= n
+
+    def join(self) -> None:
+        """
+        Blocks until every item put has been marked as done.
+        :return: None
+        """
+        _active().wait_until(lambda: not self.unfinished_tasks)
+
+
+##### Exploration #####
+
+
+def _run_schedules(main: Callable,
+                   check: Optional[Callable[[str], Optional[str]]],
+                   strategy, max_schedules: int, time_budget: Optional[float],
+                   max_steps: int, stop_on_failure: bool) -> ExplorationResult:
+    """
+    Private helper function to run schedules of the given main function with
+    the given strategy.
+    :param main: callable
+    :param check: callable
+    :param strategy: strategy
+    :param max_schedules: int
+    :param time_budget: float
+    :param max_steps: int
+    :param stop_on_failure: bool
+    :return: ExplorationResult
+    """
+    global _scheduler
+    if _scheduler is not None:
+        raise RuntimeError('explore() cannot be nested')
+    scheduler = _Scheduler(max_steps)
+    _scheduler = scheduler
+    failures = []
+    n_schedules = 0
+    exhausted = False
+    real_stdout = sys.stdout
+    start = time.perf_counter()
+    try:
+        while n_schedules < max_schedules:
+            if (time_budget is not None and
+                    time.perf_counter() - start >= time_budget):
+                break
+            if not strategy.next_schedule(n_schedules):
+                exhausted = True
+                break
+            # One thread runs at a time, so every schedule simply gets its own
+            # sys.stdout
+            sys.stdout = output = io.StringIO()
+            try:
+                scheduler.run(main, strategy)
+            finally:
+                sys.stdout = real_stdout
+            errors = scheduler.errors
+            if check is not None:
+                message = check(output.getvalue())
+                if message:
+                    errors.append(message)
+            if errors:
+                failures.append(Failure(
+                    n_schedules, strategy.schedule_seed, scheduler.choices,
+                    scheduler.trace, '; '.join(errors), output.getvalue()
+                ))
+            n_schedules += 1
+            if failures and stop_on_failure:
+                break
+    finally:
+        _scheduler = None
+        scheduler.shutdown()
+    return ExplorationResult(
+        n_schedules, time.perf_counter() - start, exhausted, failures
+    )
+
+
+def _explore_chunk(chunk: Tuple[int, int]) -> ExplorationResult:
+    """
+    Private helper function to explore the given (first schedule, number of
+    schedules) chunk of a parallel RANDOM exploration, in a forked process.
+    :param chunk: tuple(int, int)
+    :return: ExplorationResult
+    """
+    main, check, seed, time_budget, max_steps, stop_on_failure = _parallel_job
+    first, n_schedules = chunk
+    result = _run_schedules(
+        main, check, _RandomStrategy(seed + first), n_schedules, time_budget,
+        max_steps, stop_on_failure
+    )
+    failures = [
+        failure._replace(schedule=failure.schedule + first)
+        for failure in result.failures
+    ]
+    return result._replace(failures=failures)
+
+
+def _explore_in_processes(main: Callable,
+                          check: Optional[Callable[[str], Optional[str]]],
+                          seed: int, max_schedules: int,
+                          time_budget: Optional[float], max_steps: int,
+                          stop_on_failure: bool,
+                          processes: int) -> ExplorationResult:
+    """
+    Private helper function to split the seeds of a RANDOM exploration into
+    contiguous chunks, one per forked process.
+    The processes are forked, so that they inherit the main and check
+    functions (which need not be picklable), and any patches applied to the
+    code under test.
+    :param main: callable
+    :param check: callable
+    :param seed: int
+    :param max_schedules: int
+    :param time_budget: float
+    :param max_steps: int
+    :param stop_on_failure: bool
+    :param processes: int
+    :return: ExplorationResult
+    """
+    global _parallel_job
+    chunk_size, remainder = divmod(max_schedules, processes)
+    chunks = []
+    first = 0
+    for i in range(processes):
+        n_schedules = chunk_size + (i < remainder)
+        chunks.append((first, n_schedules))
+        first += n_schedules
+    _parallel_job = (
+        main, check, seed, time_budget, max_steps, stop_on_failure
+    )
+    start = time.perf_counter()
+    try:
+        with mp.get_context('fork').Pool(processes) as pool:
+            results = pool.map(_explore_chunk, chunks)
+    finally:
+        _parallel_job = None
+    failures = sorted(
+        (failure for result in results for failure in result.failures),
+        key=lambda failure: failure.schedule
+    )
+    if stop_on_failure:
+        failures = failures[:1]
+    return ExplorationResult(
+        sum(result.n_schedules for result in results),
+        time.perf_counter() - start, False, failures
+    )
+
+
+def explore(main: Callable,
+            check: Optional[Callable[[str], Optional[str]]] = None,
+            strategy: str = RANDOM, seed: int = 0, max_schedules: int = 10000,
+            time_budget: Optional[float] = None, max_steps: int = 100000,
+            stop_on_failure: bool = True,
+            processes: int = 1) -> ExplorationResult:
+    """
+    Runs the given main function under up to "max_schedules" different thread
+    interleavings (or for up to "time_budget" seconds).
+    After every schedule, check is called with everything the schedule printed,
+    and returns a failure message, or None if the schedule passed; an uncaught
+    exception in any thread, a deadlock or more than "max_steps" scheduling
+    decisions also fail the schedule.
+    With RANDOM, the schedules can be split across the given number of forked
+    processes (POSIX only).
+    :param main: callable
+    :param check: callable
+    :param strategy: str
+    :param seed: int
+    :param max_schedules: int
+    :param time_budget: float
+    :param max_steps: int
+    :param stop_on_failure: bool
+    :param processes: int
+    :return: ExplorationResult
+    """
+    if processes > 1:
+        if strategy != RANDOM:
+            raise ValueError('Only the RANDOM strategy runs in parallel')
+        return _explore_in_processes(
+            main, check, seed, max_schedules, time_budget, max_steps,
+            stop_on_failure, processes
+        )
+    if strategy == RANDOM:
+        strategy_impl = _RandomStrategy(seed)
+    elif strategy == SYSTEMATIC:
+        strategy_impl = _SystematicStrategy()
+    else:
+        raise ValueError(f'Unknown strategy {strategy!r}')
+    return _run_schedules(
+        main, check, strategy_impl, max_schedules, time_budget, max_steps,
+        stop_on_failure
+    )
+
+
+def replay(main: Callable, choices: List[int],
+           check: Optional[Callable[[str], Optional[str]]] = None,
+           max_steps: int = 100000) -> ExplorationResult:
+    """
+    Runs the given main function once, under the schedule given by its choices
+    (as reported in Failure.choices).
+    :param main: callable
+    :param choices: list[int]
+    :param check: callable
+    :param max_steps: int
+    :return: ExplorationResult
+    """
+    return _run_schedules(
+        main, check, _ReplayStrategy(choices), 1, None, max_steps, True
+    )
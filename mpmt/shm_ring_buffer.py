@@ -0,0 +1,248 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cross-process ring buffer over shared memory.
+
+Between processes, multiprocessing.Queue pays for a feeder thread, a pipe, and
+pickling for every message.
+Instead, ShmRingBuffer keeps a fixed number of fixed-size slots in a
+multiprocessing.shared_memory block:
+- The producers write a message into the slot at "head", and the consumer reads
+  the message from the slot at "tail", directly in shared memory
+- Two counting semaphores ("items" and "spaces") tell how many slots are filled
+  and free, so that the blocking waits sleep in the kernel rather than
+  busy-spin
+  (On Linux, an uncontended semaphore operation is a single atomic instruction
+  in user space.)
+- With a single producer, the data path takes no lock at all; with multiple
+  producers, the producers serialize on a lock only to claim a slot
+
+Messages are raw bytes of at most "slot_size" bytes; encoding them is up to the
+caller (e.g., struct for numbers, UTF-8 for text).
+"""
+
+__author__ = 'Ziang Lu'
+
+import multiprocessing as mp
+import struct
+from multiprocessing import shared_memory
+from typing import Optional
+
+_HEADER = struct.Struct('QQ')  # head, tail
+_LENGTH = struct.Struct('I')  # Message length at the start of every slot
+
+
+class ShmRingBuffer:
+    """
+    Single-consumer ring buffer over shared memory, with either a single
+    producer or multiple producers.
+    An instance can be passed to child processes as a Process argument.
+    """
+
+    def __init__(self, n_slots: int = 1024, slot_size: int = 256,
+                 multi_producer: bool = False, ctx=None):
+        """
+        Constructor with parameter.
+        :param n_slots: int
+        :param slot_size: int
+        :param multi_producer: bool
+        :param ctx: multiprocessing context
+        """
+        if ctx is None:
+            ctx = mp.get_context()
+        self._n_slots = n_slots
+        self._slot_size = slot_size
+        self._stride = _LENGTH.size + slot_size
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=_HEADER.size + n_slots * self._stride
+        )
+        _HEADER.pack_into(self._shm.buf, 0, 0, 0)
+        self._items = ctx.Semaphore(0)  # Number of filled slots
+        self._spaces = ctx.Semaphore(n_slots)  # Number of free slots
+        self._producer_lock = ctx.Lock() if multi_producer else None
+        self._owner = True  # Only the creator unlinks the shared memory
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['_shm'] = self._shm.name
+        state['_owner'] = False
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=state['_shm'])
+
+    @property
+    def slot_size(self) -> int:
+        """
+        Accessor of slot_size.
+        :return: int
+        """
+        return self._slot_size
+
+    def try_put(self, data: bytes) -> bool:
+        """
+        Puts the given message without blocking.
+        :param data: bytes
+        :return: bool whether the message was put
+        """
+        return self.put(data, block=False)
+
+    def put(self, data: bytes, block: bool = True,
+            timeout: Optional[float] = None) -> bool:
+        """
+        Puts the given message, blocking until there is a free slot if
+        instructed.
+        :param data: bytes
+        :param block: bool
+        :param timeout: float
+        :return: bool whether the message was put
+        """
+        if len(data) > self._slot_size:
+            raise ValueError(
+                f'Message of {len(data)} bytes exceeds the slot size '
+                f'{self._slot_size}'
+            )
+        if not self._spaces.acquire(block, timeout):
+            return False
+        if self._producer_lock is None:
+            self._write(data)
+        else:
+            with self._producer_lock:
+                self._write(data)
+        self._items.release()
+        return True
+
+    def _write(self, data: bytes) -> None:
+        """
+        Private helper method to write the given message into the slot at
+        "head", and advance "head".
+        :param data: bytes
+        :return: None
+        """
+        buf = self._shm.buf
+        head, _ = _HEADER.unpack_from(buf, 0)
+        offset = _HEADER.size + (head % self._n_slots) * self._stride
+        _LENGTH.pack_into(buf, offset, len(data))
+        start = offset + _LENGTH.size
+        buf[start:start + len(data)] = data
+        struct.pack_into('Q', buf, 0, head + 1)
+
+    def try_get(self) -> Optional[bytes]:
+        """
+        Gets a message without blocking.
+        :return: bytes or None if the buffer is empty
+        """
+        return self.get(block=False)
+
+    def get(self, block: bool = True,
+            timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        Gets a message, blocking until there is one if instructed.
+        :param block: bool
+        :param timeout: float
+        :return: bytes or None if no message is available
+        """
+        if not self._items.acquire(block, timeout):
+            return None
+        buf = self._shm.buf
+        tail = struct.unpack_from('Q', buf, 8)[0]
+        offset = _HEADER.size + (tail % self._n_slots) * self._stride
+        length = _LENGTH.unpack_from(buf, offset)[0]
+        start = offset + _LENGTH.size
+        data = bytes(buf[start:start + length])
+        struct.pack_into('Q', buf, 8, tail + 1)
+        self._spaces.release()
+        return data
+
+    def close(self) -> None:
+        """
+        Closes this process's view of the shared memory, and also unlinks the
+        shared memory if this process created it.
+        :return: None
+        """
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+##### Counter & print() managers across processes #####
+
+_COUNT = struct.Struct('q')
+_STOP = b''  # End-of-stream message
+
+
+def worker(counter_channel: ShmRingBuffer) -> None:
+    """
+    Process function that increments "counter" by 1, by sending a message to the
+    "counter"-access channel.
+    :param counter_channel: ShmRingBuffer
+    :return: None
+    """
+    counter_channel.put(_COUNT.pack(1))
+
+
+def counter_manager(counter_channel: ShmRingBuffer,
+                    print_channel: ShmRingBuffer) -> None:
+    """
+    Process function that has exclusive right to access "counter", and sends
+    its values to the print()-access channel.
+    :param counter_channel: ShmRingBuffer
+    :param print_channel: ShmRingBuffer
+    :return: None
+    """
+    counter = 0
+    while True:
+        message = counter_channel.get()
+        if message == _STOP:
+            print_channel.put(_STOP)
+            return
+        counter += _COUNT.unpack(message)[0]
+        print_channel.put(f'Counter value: {counter}\n----------'.encode())
+
+
+def counter_demo() -> None:
+    """
+    comm_via_atomic_message_queue.py across processes, with the channels
+    replaced by ShmRingBuffers.
+    :return: None
+    """
+    counter_channel = ShmRingBuffer(n_slots=16, slot_size=8, multi_producer=True)
+    print_channel = ShmRingBuffer(n_slots=16, slot_size=64)
+    manager = mp.Process(
+        target=counter_manager, args=(counter_channel, print_channel)
+    )
+    manager.start()
+    print('Starting up')
+    workers = [
+        mp.Process(target=worker, args=(counter_channel,)) for _ in range(10)
+    ]
+    for worker_process in workers:
+        worker_process.start()
+    for worker_process in workers:
+        worker_process.join()
+    counter_channel.put(_STOP)
+    # The main process acts as the print()-access manager
+    while True:
+        message = print_channel.get()
+        if message == _STOP:
+            break
+        print(message.decode())
+    manager.join()
+    print('Finishing up')
+    counter_channel.close()
+    print_channel.close()
+
+
+if __name__ == '__main__':
+    counter_demo()
+
+    # Output:
+    # Starting up
+    # Counter value: 1
+    # ----------
+    # ...
+    # Counter value: 10
+    # ----------
+    # Finishing up
@@ -0,0 +1,263 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Conditional-request response cache in front of the site size fetcher.
+
+When polling the same sites over and over, most pages haven't changed since the
+last poll, so downloading them from scratch is wasted work.
+Instead, for every URL, cache its page size together with its validators (ETag
+and Last-Modified), and then
+1. While the cached entry is still fresh according to Cache-Control max-age,
+   simply answer from the cache without touching the network
+2. Otherwise, send a conditional request (If-None-Match / If-Modified-Since)
+   If the server answers 304 Not Modified, the cached size is reused, and the
+   page body is never downloaded.
+
+The cache is bounded with LRU eviction, and can optionally be persisted to disk
+across runs.
+"""
+
+__author__ = 'Ziang Lu'
+
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional
+
+from mpmt.fetching import CHUNK_SIZE, get_session
+
+if TYPE_CHECKING:
+    import requests
+
+
+class CacheEntry(NamedTuple):
+    """
+    Cached page size of a URL, together with its validators.
+    """
+    size: int
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires: float  # Wall-clock time until which the entry is fresh
+    # Freshness lifetime (in seconds) from the last Cache-Control, reused after
+    # a 304 without one (defaulted for the cache files saved before it)
+    max_age: int = 0
+
+
+class SiteSizeCache:
+    """
+    Thread-safe, LRU-bounded cache of page sizes, which revalidates its entries
+    with conditional requests.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None):
+        """
+        Constructor with parameter.
+        If path is given and exists, the cache is loaded from it.
+        :param max_entries: int
+        :param path: str
+        """
+        self._max_entries = max_entries
+        self._path = path
+        self._entries = OrderedDict()  # In LRU order, oldest first
+        self._lock = Lock()
+        # Counters
+        self._hits = 0  # Answered from a fresh entry, without any request
+        self._revalidations = 0  # Answered from an entry after a 304
+        self._misses = 0  # Downloaded the page body
+        self._bytes_saved = 0  # Page bytes not downloaded thanks to the cache
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def site_size(self, url: str,
+                  session: Optional['requests.Session'] = None,
+                  timeout=None) -> int:
+        """
+        Returns the page size in bytes of the given URL, answered from the cache
+        whenever possible.
+        :param url: str
+        :param session: Session
+        :param timeout: float or tuple(float, float)
+        :return: int
+        """
+        if session is None:
+            session = get_session()
+        entry = self._get(url)
+        if entry is not None and time.time() < entry.expires:
+            self._count(hits=1, bytes_saved=entry.size)
+            return entry.size
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        with session.get(
+            url, headers=headers, stream=True, timeout=timeout
+        ) as response:
+            if response.status_code == 304 and entry is not None:
+                size = entry.size
+                self._count(revalidations=1, bytes_saved=size)
+                # A 304 may come with updated validators or Cache-Control
+                etag = response.headers.get('ETag', entry.etag)
+                last_modified = response.headers.get(
+                    'Last-Modified', entry.last_modified
+                )
+            else:
+                size = sum(
+                    len(chunk) for chunk in response.iter_content(CHUNK_SIZE)
+                )
+                self._count(misses=1)
+                if response.status_code != 200:
+                    return size
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+            cache_control_header = response.headers.get('Cache-Control')
+            revalidated = response.status_code == 304 and entry is not None
+
+        if cache_control_header is None and revalidated:
+            # A 304 without Cache-Control keeps the previous freshness lifetime
+            max_age = entry.max_age
+        else:
+            cache_control = _parse_cache_control(cache_control_header or '')
+            if 'no-store' in cache_control:
+                self._discard(url)
+                return size
+            max_age = 0
+            if 'no-cache' not in cache_control:
+                max_age_str = cache_control.get('max-age', '0')
+                if max_age_str.isdigit():
+                    max_age = int(max_age_str)
+        if etag or last_modified or max_age:
+            self._put(url, CacheEntry(
+                size, etag, last_modified, time.time() + max_age, max_age
+            ))
+        return size
+
+    def _get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Private helper method to get the entry of the given URL, and mark it as
+        most recently used.
+        :param url: str
+        :return: CacheEntry or None
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def _put(self, url: str, entry: CacheEntry) -> None:
+        """
+        Private helper method to put the given entry, evicting the least
+        recently used entries if the cache is full.
+        :param url: str
+        :param entry: CacheEntry
+        :return: None
+        """
+        with self._lock:
+            self._entries[url] = entry
+            self._entries.move_to_end(url)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _discard(self, url: str) -> None:
+        """
+        Private helper method to discard the entry of the given URL, if any.
+        :param url: str
+        :return: None
+        """
+        with self._lock:
+            self._entries.pop(url, None)
+
+    def _count(self, hits: int = 0, revalidations: int = 0, misses: int = 0,
+               bytes_saved: int = 0) -> None:
+        """
+        Private helper method to update the counters.
+        :param hits: int
+        :param revalidations: int
+        :param misses: int
+        :param bytes_saved: int
+        :return: None
+        """
+        with self._lock:
+            self._hits += hits
+            self._revalidations += revalidations
+            self._misses += misses
+            self._bytes_saved += bytes_saved
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit/revalidation/miss and bytes-saved counters.
+        :return: dict{str: int}
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'revalidations': self._revalidations,
+                'misses': self._misses,
+                'bytes_saved': self._bytes_saved,
+            }
+
+    def save(self) -> None:
+        """
+        Saves the cache entries to the cache file.
+        :return: None
+        """
+        self._check_path()
+        with self._lock:
+            data = {url: list(entry) for url, entry in self._entries.items()}
+        # Write to a temporary file first, so that a crash never leaves a
+        # half-written cache file behind
+        dirname = os.path.dirname(os.path.abspath(self._path))
+        fd, tmp_path = tempfile.mkstemp(dir=dirname)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def load(self) -> None:
+        """
+        Loads the cache entries from the cache file.
+        :return: None
+        """
+        self._check_path()
+        with open(self._path) as f:
+            data = json.load(f)
+        with self._lock:
+            for url, fields in data.items():
+                self._entries[url] = CacheEntry(*fields)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _check_path(self) -> None:
+        """
+        Private helper method to check that this cache has a cache file to be
+        persisted to.
+        :return: None
+        """
+        if self._path is None:
+            raise ValueError('This cache is in-memory only: it has no path')
+
+
+def _parse_cache_control(header: str) -> Dict[str, str]:
+    """
+    Private helper function to parse the given Cache-Control header into a
+    dictionary of directives.
+    :param header: str
+    :return: dict{str: str}
+    """
+    directives = {}
+    for directive in header.split(','):
+        name, _, value = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
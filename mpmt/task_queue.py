@@ -0,0 +1,237 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Distributed processing: distribute multiple processes to multiple machines.
+
+The task server exposes a task queue and a result queue over the network through
+a BaseManager, and the task workers (possibly on other machines) connect to it,
+take tasks from the task queue, and put the results into the result queue.
+
+Run "mpmt-task-server" on one machine, and then "mpmt-task-worker" on others
+(or "python -m mpmt.task_queue server" / "python -m mpmt.task_queue worker").
+"""
+
+__author__ = 'Ziang Lu'
+
+import argparse
+import queue
+import random
+import time
+from multiprocessing.managers import BaseManager
+from typing import Callable, List, Optional
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 5000
+DEFAULT_AUTHKEY = b'abc'
+
+# The two queues live in the manager's server process, and are only created
+# there (by _init_queues()), so that importing this module creates nothing
+_task_queue: Optional[queue.Queue] = None
+_result_queue: Optional[queue.Queue] = None
+
+
+def _init_queues(maxsize: int) -> None:
+    """
+    Private helper function to create the task queue and the result queue,
+    within the manager's server process.
+    :param maxsize: int
+    :return: None
+    """
+    global _task_queue, _result_queue
+    _task_queue = queue.Queue(maxsize=maxsize)
+    _result_queue = queue.Queue(maxsize=maxsize)
+
+
+def _get_task_queue() -> queue.Queue:
+    """
+    Private helper function to get the task queue, within the manager's server
+    process.
+    Module-level functions (rather than lambdas) are registered, so that the
+    manager can also be started under the "spawn" start method.
+    :return: Queue
+    """
+    return _task_queue
+
+
+def _get_result_queue() -> queue.Queue:
+    """
+    Private helper function to get the result queue, within the manager's server
+    process.
+    :return: Queue
+    """
+    return _result_queue
+
+
+class ServerQueueManager(BaseManager):
+    pass
+
+
+# 给ServerQueueManager注册两个函数来分别返回两个queue
+ServerQueueManager.register('get_task_queue', callable=_get_task_queue)
+ServerQueueManager.register('get_result_queue', callable=_get_result_queue)
+
+
+class WorkerQueueManager(BaseManager):
+    pass
+
+
+# 由于WorkerQueueManager只从网络上获取queue, 所以注册时只提供名字
+WorkerQueueManager.register('get_task_queue')
+WorkerQueueManager.register('get_result_queue')
+
+
+def start_server(host: str = '', port: int = DEFAULT_PORT,
+                 authkey: bytes = DEFAULT_AUTHKEY,
+                 maxsize: int = 5) -> ServerQueueManager:
+    """
+    Creates and starts a server manager bound to the given address, whose task
+    queue and result queue hold at most "maxsize" items each.
+    The caller is responsible for calling shutdown() on the returned manager.
+    :param host: str
+    :param port: int
+    :param authkey: bytes
+    :param maxsize: int
+    :return: ServerQueueManager
+    """
+    server_manager = ServerQueueManager(address=(host, port), authkey=authkey)
+    server_manager.start(initializer=_init_queues, initargs=(maxsize,))
+    return server_manager
+
+
+def connect_worker(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                   authkey: bytes = DEFAULT_AUTHKEY) -> WorkerQueueManager:
+    """
+    Creates a worker manager connected to the task server at the given address.
+    :param host: str
+    :param port: int
+    :param authkey: bytes
+    :return: WorkerQueueManager
+    """
+    worker_manager = WorkerQueueManager(address=(host, port), authkey=authkey)
+    worker_manager.connect()
+    return worker_manager
+
+
+def square(n: int) -> str:
+    """
+    Dummy task, which "calculates" the square of the given number.
+    :param n: int
+    :return: str
+    """
+    print(f'Calculating {n} * {n}...')
+    time.sleep(1)
+    return f'{n} * {n} = {n * n}'
+
+
+def run_worker(task_q, result_q, n_tasks: int = 10, timeout: float = 1.0,
+               work: Callable = square) -> int:
+    """
+    Takes at most "n_tasks" tasks from the given task queue (waiting at most
+    "timeout" seconds for each), runs them with the given work function, and
+    puts the results into the given result queue.
+    Returns the number of tasks done.
+    :param task_q: Queue proxy
+    :param result_q: Queue proxy
+    :param n_tasks: int
+    :param timeout: float
+    :param work: callable
+    :return: int
+    """
+    n_done = 0
+    for _ in range(n_tasks):
+        try:
+            n = task_q.get(timeout=timeout)
+        except queue.Empty:
+            # The proxy re-raises the queue.Empty raised in the server process
+            print('Task queue is empty.')
+            continue
+        result_q.put(work(n))
+        n_done += 1
+    return n_done
+
+
+##### Command-line entry points #####
+
+
+def _parser(description: str) -> argparse.ArgumentParser:
+    """
+    Private helper function to create an argument parser with the options
+    shared by the server and the worker.
+    :param description: str
+    :return: ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        '--authkey', default=DEFAULT_AUTHKEY.decode(),
+        help='shared secret between the server and the workers'
+    )
+    parser.add_argument('--n-tasks', type=int, default=10)
+    return parser
+
+
+def server_main(argv: Optional[List[str]] = None) -> None:
+    """
+    Task server entry point: puts random tasks into the task queue, and prints
+    the results the workers send back.
+    :param argv: list[str]
+    :return: None
+    """
+    parser = _parser('Distributed processing task server')
+    parser.add_argument('--host', default='', help='address to bind to')
+    parser.add_argument('--result-timeout', type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    server_manager = start_server(args.host, args.port, args.authkey.encode())
+    print('Server manager started.')
+    try:
+        # 通过ServerQueueManager封装来获取task_queue和result_queue
+        task_q = server_manager.get_task_queue()  # 本质上是个proxy
+        result_q = server_manager.get_result_queue()  # 本质上是个proxy
+
+        # Note that the queues are bounded, so putting more tasks than
+        # "maxsize" blocks until the workers catch up
+        for _ in range(args.n_tasks):
+            n = random.randint(0, 10000)
+            print(f'Put task {n}...')
+            task_q.put(n)
+
+        print('Getting results...')
+        for _ in range(args.n_tasks):
+            # Will block here and wait for getting results
+            r = result_q.get(timeout=args.result_timeout)
+            print(f'Result: {r}')
+    finally:
+        server_manager.shutdown()
+    print('Server manager exited.')
+
+
+def worker_main(argv: Optional[List[str]] = None) -> None:
+    """
+    Task worker entry point: connects to the task server, and works on its
+    tasks.
+    :param argv: list[str]
+    :return: None
+    """
+    parser = _parser('Distributed processing task worker')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='task server')
+    args = parser.parse_args(argv)
+
+    print(f'Connecting to server {args.host}...')
+    worker_manager = connect_worker(args.host, args.port, args.authkey.encode())
+    print('Worker started.')
+    run_worker(
+        worker_manager.get_task_queue(), worker_manager.get_result_queue(),
+        n_tasks=args.n_tasks
+    )
+    print('Worker exits.')
+
+
+if __name__ == '__main__':
+    import sys
+
+    roles = {'server': server_main, 'worker': worker_main}
+    if len(sys.argv) < 2 or sys.argv[1] not in roles:
+        sys.exit('usage: python -m mpmt.task_queue {server,worker} [options]')
+    roles[sys.argv[1]](sys.argv[2:])
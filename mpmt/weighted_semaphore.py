@@ -0,0 +1,369 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Weighted, fair bulkhead semaphore, for both threads and asyncio.
+
+In sync_blocking.py, every caller of the BoundedSemaphore takes exactly one
+unit, with no timeout and no fairness guarantee.
+When capping the concurrent access to an expensive backend, callers usually
+need different amounts of it, and then a greedy semaphore lets the light
+callers keep slipping in ahead of a heavy caller, which starves.
+Instead, in WeightedSemaphore,
+- Every caller acquires a variable weight
+- The waiters are served strictly in order, either FIFO or by priority (the
+  lower the value, the earlier), and a waiter which doesn't fit yet blocks the
+  ones behind it, so that nobody starves
+- Acquisition supports timeouts (deadlines)
+- Utilization and queue-length metrics are exposed
+AsyncWeightedSemaphore is its asyncio twin.
+"""
+
+__author__ = 'Ziang Lu'
+
+import heapq
+import itertools
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager
+from threading import Condition, Lock
+from typing import Dict, Optional
+
+FIFO = 'fifo'
+PRIORITY = 'priority'
+
+_WAITING = 'waiting'
+_GRANTED = 'granted'
+_CANCELLED = 'cancelled'
+
+
+class _Waiter:
+    """
+    A caller waiting for its weight.
+    """
+    __slots__ = ['weight', 'state', 'signal']
+
+    def __init__(self, weight: int, signal):
+        """
+        Constructor with parameter.
+        :param weight: int
+        :param signal: Condition or Future
+        """
+        self.weight = weight
+        self.state = _WAITING
+        self.signal = signal
+
+
+class _WeightedCore(ABC):
+    """
+    Waiter queue and metrics shared by the thread and asyncio versions, which
+    provide the signalling of the granted waiters.
+    Not thread-safe by itself.
+    """
+
+    def __init__(self, capacity: int, policy: str = FIFO):
+        """
+        Constructor with parameter.
+        :param capacity: int
+        :param policy: str
+        """
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        if policy not in (FIFO, PRIORITY):
+            raise ValueError(f"policy must be '{FIFO}' or '{PRIORITY}'")
+        self._capacity = capacity
+        self._policy = policy
+        self._available = capacity
+        self._heap = []  # [(priority, sequence number, waiter)]
+        self._seq = itertools.count()
+        # Metrics
+        self._n_waiting = 0
+        self._max_queue_length = 0
+        self._n_acquired = 0
+        self._n_timeouts = 0
+        self._n_cancelled = 0
+        self._created_at = time.monotonic()
+        self._last_change = self._created_at
+        self._in_use_integral = 0.0  # Integral of in_use over time
+
+    def _check_weight(self, weight: int) -> None:
+        if not 0 < weight <= self._capacity:
+            raise ValueError(f'weight must be in [1, {self._capacity}]')
+
+    def _push(self, waiter: _Waiter, priority: int) -> None:
+        """
+        Private helper method to enqueue the given waiter.
+        :param waiter: _Waiter
+        :param priority: int
+        :return: None
+        """
+        key = priority if self._policy == PRIORITY else 0
+        heapq.heappush(self._heap, (key, next(self._seq), waiter))
+        self._n_waiting += 1
+        self._max_queue_length = max(self._max_queue_length, self._n_waiting)
+
+    def _grant(self) -> None:
+        """
+        Private helper method to grant the waiters at the head of the queue, as
+        long as they fit.
+        :return: None
+        """
+        heap = self._heap
+        while heap:
+            waiter = heap[0][2]
+            if waiter.state == _WAITING and not self._can_signal(waiter):
+                self._mark_cancelled(waiter)
+            if waiter.state != _WAITING:  # Cancelled: lazily removed here
+                heapq.heappop(heap)
+                continue
+            if waiter.weight > self._available:
+                # Strict ordering: nobody jumps ahead of the head waiter
+                break
+            heapq.heappop(heap)
+            self._n_waiting -= 1
+            waiter.state = _GRANTED
+            self._take(waiter.weight)
+            self._signal(waiter)
+
+    def _cancel(self, waiter: _Waiter, timed_out: bool) -> None:
+        """
+        Private helper method to give up waiting, either on timeout, or because
+        the waiting task was cancelled.
+        :param waiter: _Waiter
+        :param timed_out: bool
+        :return: None
+        """
+        if timed_out:
+            self._n_timeouts += 1
+        else:
+            self._n_cancelled += 1
+        if waiter.state == _WAITING:
+            self._mark_cancelled(waiter)
+            # The waiters behind may fit now
+            self._grant()
+
+    def _mark_cancelled(self, waiter: _Waiter) -> None:
+        waiter.state = _CANCELLED
+        self._n_waiting -= 1
+
+    def _take(self, weight: int) -> None:
+        self._account()
+        self._available -= weight
+        self._n_acquired += 1
+
+    def _give(self, weight: int) -> None:
+        self._check_weight(weight)
+        if self._available + weight > self._capacity:
+            raise ValueError('Semaphore released too many times')
+        self._account()
+        self._available += weight
+
+    def _account(self) -> None:
+        """
+        Private helper method to accumulate the in-use integral up to now.
+        :return: None
+        """
+        now = time.monotonic()
+        self._in_use_integral += (
+            (self._capacity - self._available) * (now - self._last_change)
+        )
+        self._last_change = now
+
+    @abstractmethod
+    def _can_signal(self, waiter: _Waiter) -> bool:
+        """
+        Private helper method to check whether the given waiter can still be
+        granted.
+        :param waiter: _Waiter
+        :return: bool
+        """
+        pass
+
+    @abstractmethod
+    def _signal(self, waiter: _Waiter) -> None:
+        """
+        Private helper method to wake up the given granted waiter.
+        :param waiter: _Waiter
+        :return: None
+        """
+        pass
+
+    def _stats(self) -> Dict[str, float]:
+        self._account()
+        elapsed = self._last_change - self._created_at
+        in_use = self._capacity - self._available
+        return {
+            'capacity': self._capacity,
+            'in_use': in_use,
+            'utilization': in_use / self._capacity,
+            'average_utilization': (
+                self._in_use_integral / (elapsed * self._capacity)
+                if elapsed > 0 else 0.0
+            ),
+            'queue_length': self._n_waiting,
+            'max_queue_length': self._max_queue_length,
+            'acquired': self._n_acquired,
+            'timeouts': self._n_timeouts,
+            'cancelled': self._n_cancelled,
+        }
+
+
+class WeightedSemaphore(_WeightedCore):
+    """
+    Thread-safe weighted, fair semaphore.
+    """
+
+    def __init__(self, capacity: int, policy: str = FIFO):
+        """
+        Constructor with parameter.
+        :param capacity: int
+        :param policy: str
+        """
+        super().__init__(capacity, policy)
+        self._lock = Lock()
+
+    def acquire(self, weight: int = 1, timeout: Optional[float] = None,
+                priority: int = 0) -> bool:
+        """
+        Acquires the given weight, waiting for at most "timeout" seconds.
+        :param weight: int
+        :param timeout: float
+        :param priority: int
+        :return: bool whether the weight was acquired
+        """
+        self._check_weight(weight)
+        with self._lock:
+            waiter = _Waiter(weight, Condition(self._lock))
+            self._push(waiter, priority)
+            self._grant()
+            if waiter.state == _GRANTED:
+                return True
+            waiter.signal.wait_for(lambda: waiter.state == _GRANTED, timeout)
+            if waiter.state == _GRANTED:
+                return True
+            self._cancel(waiter, timed_out=True)
+            return False
+
+    def release(self, weight: int = 1) -> None:
+        """
+        Releases the given weight.
+        :param weight: int
+        :return: None
+        """
+        with self._lock:
+            self._give(weight)
+            self._grant()
+
+    @contextmanager
+    def hold(self, weight: int = 1, timeout: Optional[float] = None,
+             priority: int = 0):
+        """
+        Context manager which holds the given weight, raising TimeoutError if
+        it cannot be acquired in time.
+        :param weight: int
+        :param timeout: float
+        :param priority: int
+        :return: None
+        """
+        if not self.acquire(weight, timeout, priority):
+            raise TimeoutError(f'Failed to acquire weight {weight} in time')
+        try:
+            yield
+        finally:
+            self.release(weight)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the utilization and queue-length metrics.
+        :return: dict{str: float}
+        """
+        with self._lock:
+            return self._stats()
+
+    def _can_signal(self, waiter: _Waiter) -> bool:
+        return True
+
+    def _signal(self, waiter: _Waiter) -> None:
+        waiter.signal.notify()
+
+
+class AsyncWeightedSemaphore(_WeightedCore):
+    """
+    Weighted, fair semaphore for asyncio tasks within a single event loop.
+    """
+
+    async def acquire(self, weight: int = 1, timeout: Optional[float] = None,
+                      priority: int = 0) -> bool:
+        """
+        Acquires the given weight, waiting for at most "timeout" seconds.
+        :param weight: int
+        :param timeout: float
+        :param priority: int
+        :return: bool whether the weight was acquired
+        """
+        # asyncio is imported on first use, rather than at the top of the
+        # module, since it dominates the import time of the thread version
+        import asyncio
+
+        self._check_weight(weight)
+        waiter = _Waiter(weight, asyncio.get_running_loop().create_future())
+        self._push(waiter, priority)
+        self._grant()
+        if waiter.state == _GRANTED:
+            return True
+        try:
+            await asyncio.wait_for(waiter.signal, timeout)
+        except asyncio.TimeoutError:
+            self._cancel(waiter, timed_out=True)
+            return False
+        except asyncio.CancelledError:
+            # Not a timeout: the waiting task itself was cancelled
+            if waiter.state == _GRANTED:
+                # Granted right before being cancelled
+                self._n_cancelled += 1
+                self.release(weight)
+            else:
+                self._cancel(waiter, timed_out=False)
+            raise
+        return True
+
+    def release(self, weight: int = 1) -> None:
+        """
+        Releases the given weight.
+        :param weight: int
+        :return: None
+        """
+        self._give(weight)
+        self._grant()
+
+    @asynccontextmanager
+    async def hold(self, weight: int = 1, timeout: Optional[float] = None,
+                   priority: int = 0):
+        """
+        Async context manager which holds the given weight, raising
+        TimeoutError if it cannot be acquired in time.
+        :param weight: int
+        :param timeout: float
+        :param priority: int
+        :return: None
+        """
+        if not await self.acquire(weight, timeout, priority):
+            raise TimeoutError(f'Failed to acquire weight {weight} in time')
+        try:
+            yield
+        finally:
+            self.release(weight)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the utilization and queue-length metrics.
+        :return: dict{str: float}
+        """
+        return self._stats()
+
+    def _can_signal(self, waiter: _Waiter) -> bool:
+        # A future cancelled by wait_for() can no longer be granted
+        return not waiter.signal.done()
+
+    def _signal(self, waiter: _Waiter) -> None:
+        waiter.signal.set_result(None)